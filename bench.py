@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for Silent Organizer
+Run: python bench.py classify [--files 100000]
+     python bench.py organize [--modes burst,growing,collisions,folders] [--output results.json]
+     python bench.py compare old.json new.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from watchdog.observers import Observer
+
+import main
+from history_store import HistoryStore
+from move_engine import TransferJournal
+from log_pipeline import setup_logging
+
+def legacy_get_file_type(filename, config):
+    """The original linear-scan classifier, kept here for comparison."""
+    file_ext = os.path.splitext(filename)[1].lower()
+    for f_type, extensions in config['file_types'].items():
+        if file_ext in extensions:
+            return f_type
+    return 'Others'
+
+def make_filename_corpus(config, count, seed=1234):
+    """Random file names: mostly configured extensions, some unknown or odd."""
+    rng = random.Random(seed)
+    known = [ext for exts in config['file_types'].values() for ext in exts]
+    odd = ['', '.part1', '.unknown', '.bak', '.tar.gz', '.JPG', '.Pdf']
+    names = []
+    for i in range(count):
+        stem = f"file_{rng.randrange(10 ** 6)}"
+        if rng.random() < 0.2:
+            stem += ".v2"
+        ext = rng.choice(odd) if rng.random() < 0.2 else rng.choice(known)
+        names.append(stem + ext)
+    return names
+
+def time_it(fn, names, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name in names:
+            fn(name)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench_classify(args):
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    names = make_filename_corpus(config, args.files)
+
+    start = time.perf_counter()
+    index = main.build_extension_index(config)
+    build_time = time.perf_counter() - start
+
+    legacy = time_it(lambda n: legacy_get_file_type(n, config), names, args.repeat)
+    indexed = time_it(lambda n: main.get_file_type(n, index), names, args.repeat)
+
+    mismatches = sum(1 for n in names
+                     if legacy_get_file_type(n, config) != main.get_file_type(n, index))
+
+    result = {
+        "benchmark": "classify",
+        "files": len(names),
+        "categories": len(config['file_types']),
+        "index_build_us": round(build_time * 1e6, 1),
+        "legacy_ns_per_file": round(legacy / len(names) * 1e9, 1),
+        "indexed_ns_per_file": round(indexed / len(names) * 1e9, 1),
+        "speedup": round(legacy / indexed, 2) if indexed else None,
+        # Differences come only from multi-part (.tar.gz) and case-folding rules
+        "mismatches": mismatches,
+    }
+    print(json.dumps(result, indent=2))
+    return result
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+def peak_rss_mb():
+    """Peak resident set size of this process, in MiB."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:
+        import psutil  # Windows has no resource module
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class OrganizeRun:
+    """Run the real organize pipeline over temporary monitored folders.
+
+    Files are created on disk, seen by a watchdog Observer and moved by
+    DownloadHandler exactly as in the daemon; only the stability interval
+    and coalescing window are shortened so a run takes seconds.
+    """
+
+    def __init__(self, root, config, folder_count=1):
+        self.root = root
+        self.config = config
+        self.folders = []
+        for i in range(folder_count):
+            folder = os.path.join(root, f"monitored_{i}")
+            os.makedirs(folder)
+            self.folders.append(folder)
+        self.created = {}
+        self.done = {}
+        self._lock = threading.Lock()
+        self._all_done = threading.Event()
+        self.expected = 0
+
+    def _on_moved(self, source, destination, stats):
+        now = time.perf_counter()
+        with self._lock:
+            self.done[source] = now
+            if len(self.done) >= self.expected:
+                self._all_done.set()
+
+    def create(self, path, data=b'x'):
+        with open(path, 'wb') as f:
+            f.write(data)
+        with self._lock:
+            self.created[path] = time.perf_counter()
+
+    def __enter__(self):
+        main.FILE_TYPE_INDEX = main.build_extension_index(self.config)
+        main.HISTORY = HistoryStore(os.path.join(self.root, 'history.jsonl'))
+        main.PROCESSED_FILES = main.ProcessedFiles()
+        main.DESTINATION_NAMES = main.DestinationNames()
+        main.start_workers(self.config)
+        main.TRANSFERS = TransferJournal(os.path.join(self.root, 'transfers.json'))
+        main.MOVE_LISTENERS.append(self._on_moved)
+        self.handler = main.DownloadHandler(self.config)
+        self.observer = Observer()
+        for folder in self.folders:
+            self.handler.add_folder(folder)
+            self.observer.schedule(self.handler, folder, recursive=False)
+        self.observer.start()
+        self.cpu_start = time.process_time()
+        return self
+
+    def wait(self, expected, timeout):
+        with self._lock:
+            self.expected = expected
+            self._all_done.clear()
+            if len(self.done) >= expected:
+                self._all_done.set()
+        return self._all_done.wait(timeout)
+
+    def __exit__(self, *exc):
+        self.cpu_seconds = time.process_time() - self.cpu_start
+        self.observer.stop()
+        self.observer.join()
+        main.stop_workers()
+        main.MOVE_LISTENERS.remove(self._on_moved)
+        main.HISTORY.close()
+
+    def result(self, mode, **extra):
+        latencies = [self.done[p] - self.created[p] for p in self.done if p in self.created]
+        elapsed = (max(self.done.values()) - min(self.created.values())) if self.done else None
+        result = {
+            "mode": mode,
+            "files": len(self.created),
+            "moved": len(self.done),
+            "elapsed_s": round(elapsed, 3) if elapsed else None,
+            "files_per_s": round(len(self.done) / elapsed, 1) if elapsed else None,
+            "latency_p50_ms": None, "latency_p90_ms": None, "latency_p99_ms": None, "latency_max_ms": None,
+            "cpu_s": round(self.cpu_seconds, 3),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        for pct, key in ((50, "latency_p50_ms"), (90, "latency_p90_ms"), (99, "latency_p99_ms"),
+                         (100, "latency_max_ms")):
+            value = percentile(latencies, pct)
+            result[key] = round(value * 1000, 1) if value is not None else None
+        result.update(extra)
+        return result
+
+def mode_burst(root, config, args):
+    """N small files dropped at once into one folder."""
+    with OrganizeRun(root, config) as run:
+        folder = run.folders[0]
+        for i in range(args.files):
+            run.create(os.path.join(folder, f"burst_{i}.pdf"))
+        run.wait(args.files, args.timeout)
+    return run.result("burst")
+
+def mode_growing(root, config, args):
+    """A few large files written slowly, like real downloads."""
+    chunk = b'\0' * (args.chunk_kb * 1024)
+    with OrganizeRun(root, config) as run:
+        folder = run.folders[0]
+        paths = [os.path.join(folder, f"video_{i}.mp4") for i in range(args.growing_files)]
+        handles = [open(p, 'wb') for p in paths]
+        for _ in range(args.growing_chunks):
+            for f in handles:
+                f.write(chunk)
+                f.flush()
+            time.sleep(args.growing_delay)
+        for path, f in zip(paths, handles):
+            f.close()
+            with run._lock:
+                run.created[path] = time.perf_counter()  # latency counted from the last write
+        run.wait(len(paths), args.timeout)
+    return run.result("growing", bytes_per_file=len(chunk) * args.growing_chunks)
+
+def mode_collisions(root, config, args):
+    """The same name dropped again and again into a folder full of copies."""
+    with OrganizeRun(root, config) as run:
+        folder = run.folders[0]
+        documents = os.path.join(folder, config['folder_paths'].get('Documents', 'Documents'))
+        os.makedirs(documents)
+        open(os.path.join(documents, 'scan.pdf'), 'wb').close()
+        for i in range(1, args.existing_copies + 1):
+            open(os.path.join(documents, f"scan_{i}.pdf"), 'wb').close()
+        for i in range(args.collision_files):
+            path = os.path.join(folder, 'scan.pdf')
+            run.create(path)
+            if not run.wait(i + 1, args.timeout):
+                break
+            run.created[f"{path}#{i}"] = run.created.pop(path)
+            run.done[f"{path}#{i}"] = run.done.pop(path)
+    return run.result("collisions", existing_copies=args.existing_copies)
+
+def mode_folders(root, config, args):
+    """Files spread over many monitored folders at once."""
+    with OrganizeRun(root, config, folder_count=args.folders) as run:
+        for i in range(args.files):
+            folder = run.folders[i % len(run.folders)]
+            run.create(os.path.join(folder, f"file_{i}.jpg"))
+        run.wait(args.files, args.timeout)
+    return run.result("folders", folders=args.folders)
+
+ORGANIZE_MODES = {
+    "burst": mode_burst,
+    "growing": mode_growing,
+    "collisions": mode_collisions,
+    "folders": mode_folders,
+}
+
+def bench_organize(args):
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    config['stability_interval'] = args.stability_interval
+    config['coalesce_window'] = args.coalesce_window
+
+    results = {"benchmark": "organize", "revision": git_revision(),
+               "date": time.strftime('%Y-%m-%d %H:%M:%S'),
+               "stability_interval": args.stability_interval, "modes": {}}
+    for mode in args.modes.split(','):
+        root = tempfile.mkdtemp(prefix=f"organizer-bench-{mode}-")
+        try:
+            setup_logging(os.path.join(root, 'bench.log'))
+            results["modes"][mode] = ORGANIZE_MODES[mode](root, config, args)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        print(json.dumps(results["modes"][mode]))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return results
+
+def bench_compare(args):
+    """Print the change in every numeric result between two saved runs."""
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print(f"{old.get('revision')} -> {new.get('revision')}")
+    for mode, new_result in new.get("modes", {}).items():
+        old_result = old.get("modes", {}).get(mode)
+        if not old_result:
+            continue
+        print(f"[{mode}]")
+        for key, value in new_result.items():
+            before = old_result.get(key)
+            if isinstance(value, (int, float)) and isinstance(before, (int, float)) and before:
+                print(f"  {key:16} {before:>12} -> {value:>12}  ({(value - before) / before * 100:+.1f}%)")
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Silent Organizer benchmarks")
+    sub = parser.add_subparsers(dest="command")
+
+    classify = sub.add_parser("classify", help="get_file_type: linear scan vs extension index")
+    classify.add_argument("--files", type=int, default=100000)
+    classify.add_argument("--repeat", type=int, default=3)
+    classify.add_argument("--config", default=main.CONFIG_FILE)
+    classify.set_defaults(func=bench_classify)
+
+    organize = sub.add_parser("organize", help="end-to-end throughput and latency of the organize pipeline")
+    organize.add_argument("--modes", default="burst,growing,collisions,folders")
+    organize.add_argument("--files", type=int, default=1000, help="files for burst and folders modes")
+    organize.add_argument("--folders", type=int, default=20)
+    organize.add_argument("--growing-files", type=int, default=4)
+    organize.add_argument("--growing-chunks", type=int, default=20)
+    organize.add_argument("--growing-delay", type=float, default=0.05)
+    organize.add_argument("--chunk-kb", type=int, default=256)
+    organize.add_argument("--collision-files", type=int, default=50)
+    organize.add_argument("--existing-copies", type=int, default=3000)
+    organize.add_argument("--stability-interval", type=float, default=0.1)
+    organize.add_argument("--coalesce-window", type=float, default=0.05)
+    organize.add_argument("--timeout", type=float, default=120)
+    organize.add_argument("--output")
+    organize.add_argument("--config", default=main.CONFIG_FILE)
+    organize.set_defaults(func=bench_organize)
+
+    compare = sub.add_parser("compare", help="compare two saved organize results")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.set_defaults(func=bench_compare)
+
+    args = parser.parse_args(argv)
+    if not getattr(args, "func", None):
+        parser.print_help()
+        return 1
+    args.func(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,101 @@
+"""
+Config persistence for Silent Organizer
+Atomic, versioned writes of config.json, with saves batched into one write
+"""
+
+import os
+import copy
+import json
+import atexit
+import threading
+
+VERSION_KEY = 'config_version'
+SAVE_DELAY = 0.3  # seconds; saves within this window become one write
+
+def read_version(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get(VERSION_KEY, 0)
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+def write_config(path, config):
+    """Replace path with config atomically and return the version written.
+
+    The data goes to a temp file that is fsynced and then renamed over the
+    old file, so a crash leaves either the old or the new config, never a
+    truncated one. The version is one higher than both the in-memory and
+    the on-disk version, so it only ever increases.
+    """
+    config[VERSION_KEY] = max(config.get(VERSION_KEY, 0), read_version(path)) + 1
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return config[VERSION_KEY]
+
+class ConfigStore:
+    """Debounced writer: save() snapshots the config, flush() writes it.
+
+    The first save() starts a timer; later saves within `delay` only
+    replace the snapshot, so a bulk edit costs one write and one reload in
+    the organizer. A snapshot identical to the last write is skipped.
+    Write errors go to `on_error` (called on the timer thread).
+    """
+
+    def __init__(self, path, delay=SAVE_DELAY, on_error=None):
+        self.path = path
+        self.delay = delay
+        self.on_error = on_error
+        self.version = read_version(path)
+        self._pending = None
+        self._written = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def load(self):
+        """Read the config file; raises OSError or ValueError like json.load."""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        self.version = config.get(VERSION_KEY, 0)
+        self._written = copy.deepcopy(config)
+        self._written.pop(VERSION_KEY, None)
+        return config
+
+    def save(self, config):
+        snapshot = copy.deepcopy(config)
+        with self._lock:
+            self._pending = snapshot
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return True
+
+    def flush(self):
+        """Write any pending snapshot now; returns False if the write failed."""
+        with self._write_lock:
+            with self._lock:
+                config, self._pending = self._pending, None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if config is None:
+                return True
+            config.pop(VERSION_KEY, None)
+            if config == self._written:
+                return True
+            written = copy.deepcopy(config)
+            config[VERSION_KEY] = self.version
+            try:
+                self.version = write_config(self.path, config)
+            except OSError as e:
+                if self.on_error:
+                    self.on_error(e)
+                return False
+            self._written = written
+            return True
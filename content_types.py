@@ -0,0 +1,120 @@
+"""
+Content sniffing for Silent Organizer
+Classify files by their leading bytes when the name has no usable extension
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+SNIFF_BYTES = 8192  # one read; enough for tar's header and the first zip entries
+DEFAULT_SNIFF_CACHE_SIZE = 10000
+
+# (magic at offset 0, extension). None means "look closer" in _refine().
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+    (b'II*\x00', '.tiff'),
+    (b'MM\x00*', '.tiff'),
+    (b'%PDF-', '.pdf'),
+    (b'{\\rtf', '.rtf'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', '.doc'),  # OLE2, also used by .xls and .ppt
+    (b'PK\x03\x04', None),
+    (b'Rar!\x1a\x07', '.rar'),
+    (b'7z\xbc\xaf\x27\x1c', '.7z'),
+    (b'\x1f\x8b', '.gz'),
+    (b'RIFF', None),
+    (b'\x1aE\xdf\xa3', '.mkv'),
+    (b'FLV\x01', '.flv'),
+    (b'0&\xb2u\x8ef\xcf\x11', '.wmv'),  # ASF
+    (b'ID3', '.mp3'),
+    (b'\xff\xfb', '.mp3'),
+    (b'\xff\xf3', '.mp3'),
+    (b'\xff\xf2', '.mp3'),
+    (b'\xff\xf1', '.aac'),
+    (b'\xff\xf9', '.aac'),
+    (b'fLaC', '.flac'),
+    (b'OggS', '.ogg'),
+)
+
+def _compile(signatures):
+    """Group signatures by their first two bytes, longest magic first."""
+    table = {}
+    for magic, ext in signatures:
+        table.setdefault(magic[:2], []).append((magic, ext))
+    return {key: tuple(sorted(entries, key=lambda entry: -len(entry[0]))) for key, entries in table.items()}
+
+PREFIX_TABLE = _compile(SIGNATURES)
+
+RIFF_TYPES = {b'WAVE': '.wav', b'AVI ': '.avi', b'WEBP': '.webp'}
+FTYP_BRANDS = {b'qt  ': '.mov', b'M4A ': '.m4a', b'M4B ': '.m4a', b'heic': '.heic', b'heix': '.heic',
+               b'mif1': '.heic', b'msf1': '.heic', b'avif': '.avif'}
+OOXML_PARTS = ((b'word/', '.docx'), (b'xl/', '.xlsx'), (b'ppt/', '.pptx'))
+ODF_TYPES = ((b'application/vnd.oasis.opendocument.text', '.odt'),
+             (b'application/vnd.oasis.opendocument.spreadsheet', '.ods'),
+             (b'application/vnd.oasis.opendocument.presentation', '.odp'),
+             (b'application/epub+zip', '.epub'))
+
+def _refine(magic, head):
+    if magic == b'RIFF':
+        return RIFF_TYPES.get(head[8:12])
+    # Zip: Office and OpenDocument files are zips whose first entries give them away
+    if head[30:38] == b'mimetype':
+        for mimetype, ext in ODF_TYPES:
+            if head.startswith(mimetype, 38):
+                return ext
+    if b'[Content_Types].xml' in head:
+        for part, ext in OOXML_PARTS:
+            if part in head:
+                return ext
+    return '.zip'
+
+def sniff_bytes(head):
+    """Extension matching the leading bytes of a file, or None."""
+    for magic, ext in PREFIX_TABLE.get(head[:2], ()):
+        if head.startswith(magic):
+            return ext if ext is not None else _refine(magic, head)
+    if head[4:8] == b'ftyp':
+        return FTYP_BRANDS.get(head[8:12], '.mp4')
+    if head[257:262] == b'ustar':
+        return '.tar'
+    return None
+
+class ContentSniffer:
+    """Cached sniff_bytes() on a file's first SNIFF_BYTES.
+
+    Results are kept in an LRU dict keyed by device, inode and mtime, so a
+    file seen again (a rescan, a retried move) costs no read at all and a
+    rewritten file is sniffed afresh. A file costs at most one small read.
+    """
+
+    def __init__(self, max_size=DEFAULT_SNIFF_CACHE_SIZE):
+        self.max_size = max_size
+        self._cache = OrderedDict()  # (dev, inode, mtime_ns) -> extension or None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def sniff(self, path, st=None):
+        try:
+            if st is None:
+                st = os.stat(path)
+            key = (st.st_dev, st.st_ino, st.st_mtime_ns)
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return self._cache[key]
+                self.misses += 1
+            with open(path, 'rb', buffering=0) as f:
+                head = f.read(SNIFF_BYTES)
+        except OSError:
+            return None
+        ext = sniff_bytes(head)
+        with self._lock:
+            self._cache[key] = ext
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return ext
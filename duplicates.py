@@ -0,0 +1,154 @@
+"""
+Duplicate detection for Silent Organizer
+Tiered content hashing: size, then the first and last 64 KiB, then a full BLAKE2
+"""
+
+import os
+import hashlib
+import threading
+
+DUPLICATE_ACTIONS = ('keep', 'skip', 'hardlink')
+DEFAULT_DUPLICATE_ACTION = 'keep'
+EDGE_BYTES = 64 * 1024
+READ_SIZE = 1024 * 1024
+
+def edge_hash(path, size):
+    """Hash of the first and last EDGE_BYTES; the whole file if it is that small."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        if size <= 2 * EDGE_BYTES:
+            h.update(f.read())
+        else:
+            h.update(f.read(EDGE_BYTES))
+            f.seek(size - EDGE_BYTES)
+            h.update(f.read(EDGE_BYTES))
+    return h.hexdigest()
+
+def full_hash(path):
+    h = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+class _FolderIndex:
+    __slots__ = ('sizes', 'hashes', 'lock')
+
+    def __init__(self):
+        self.sizes = {}  # size -> set of file names
+        self.hashes = {}  # name -> [(inode, size, mtime_ns), edge hash, full hash]
+        self.lock = threading.Lock()
+
+class DuplicateFinder:
+    """Find a file in a destination folder with the same content as a new one.
+
+    Each destination folder gets an index of size -> names, seeded once
+    with scandir and kept current by add() after our own moves, so most
+    files are ruled out by size without opening anything. Same-size
+    candidates are compared by a hash of their first and last 64 KiB, and
+    only if those match by a full BLAKE2 hash. Candidate hashes are cached
+    per folder and reused while the file's inode, size and mtime are
+    unchanged; the incoming file is hashed at most once per tier.
+    """
+
+    def __init__(self):
+        self._folders = {}  # normcased folder -> _FolderIndex
+        self._guard = threading.Lock()
+        self.hashed_bytes = 0
+
+    def _folder(self, folder):
+        folder_key = os.path.normcase(os.path.abspath(folder))
+        with self._guard:
+            index = self._folders.get(folder_key)
+            if index is not None:
+                return index
+            index = self._folders[folder_key] = _FolderIndex()
+            index.lock.acquire()  # users of this folder wait for the seed, other folders do not
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            index.sizes.setdefault(entry.stat().st_size, set()).add(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        finally:
+            index.lock.release()
+        return index
+
+    def add(self, path, size):
+        """Record a file we just put into a destination folder."""
+        if not size:
+            return
+        index = self._folder(os.path.dirname(path))
+        with index.lock:
+            index.sizes.setdefault(size, set()).add(os.path.basename(path))
+
+    def _hashed(self, count):
+        with self._guard:
+            self.hashed_bytes += count
+
+    def _digest(self, index, name, path, st, full):
+        identity = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with index.lock:
+            entry = index.hashes.get(name)
+            if entry is None or entry[0] != identity:
+                entry = index.hashes[name] = [identity, None, None]
+            value = entry[2 if full else 1]
+        if value is None:
+            value = full_hash(path) if full else edge_hash(path, st.st_size)
+            self._hashed(st.st_size if full else min(st.st_size, 2 * EDGE_BYTES))
+            with index.lock:
+                entry[2 if full else 1] = value
+        return value
+
+    def find(self, folder, src, st=None):
+        """Path of a file in folder identical to src, or None."""
+        st = st or os.stat(src)
+        size = st.st_size
+        if size == 0:
+            return None  # also what a reserved-but-unfilled name looks like
+        index = self._folder(folder)
+        with index.lock:
+            names = sorted(index.sizes.get(size, ()))
+        src_edge = src_full = None
+        for name in names:
+            path = os.path.join(folder, name)
+            try:
+                cst = os.stat(path)
+            except OSError:
+                cst = None
+            if cst is None or cst.st_size != size:
+                with index.lock:  # deleted or rewritten since we indexed it
+                    index.sizes.get(size, set()).discard(name)
+                    index.hashes.pop(name, None)
+                    if cst is not None:
+                        index.sizes.setdefault(cst.st_size, set()).add(name)
+                continue
+            if (cst.st_dev, cst.st_ino) == (st.st_dev, st.st_ino):
+                continue
+            if src_edge is None:
+                src_edge = edge_hash(src, size)
+                self._hashed(min(size, 2 * EDGE_BYTES))
+            if self._digest(index, name, path, cst, False) != src_edge:
+                continue
+            if size <= 2 * EDGE_BYTES:
+                return path  # the edge hash already covered every byte
+            if src_full is None:
+                src_full = full_hash(src)
+                self._hashed(size)
+            if self._digest(index, name, path, cst, True) == src_full:
+                return path
+        return None
+
+def link_duplicate(existing, destination_path):
+    """Replace the reserved destination_path with a hard link to existing."""
+    tmp_path = destination_path + '.organizer-link'
+    os.link(existing, tmp_path)
+    try:
+        os.replace(tmp_path, destination_path)
+    except OSError:
+        os.unlink(tmp_path)
+        raise
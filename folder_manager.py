@@ -11,6 +11,12 @@ import subprocess
 import threading
 import time
 import psutil
+import urllib.request
+from supervisor import read_pid_file, connect, iter_messages, send_command
+from config_store import ConfigStore
+from history_index import HistoryIndex, PAGE_SIZE
+from history_store import HistoryStore, HISTORY_FILE, LEGACY_HISTORY_FILE
+from undo import plan_undo, run_undo
 from tkinter import Tk, filedialog, messagebox, ttk, simpledialog
 import tkinter as tk
 
@@ -23,13 +29,16 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 CONFIG_FILE = resource_path('config.json')
+CONFIG_STORE = ConfigStore(CONFIG_FILE)
 STATE_FILE = resource_path('organizer_state.json')
+STARTUP_TIMEOUT = 15  # seconds to wait for a new organizer to publish its PID file
+STOP_TIMEOUT = 10  # seconds to let the organizer finish in-flight moves before killing it
+ROW_BATCH = 200  # folder rows inserted per idle callback, so long lists never freeze the panel
 
 def load_config():
     """Load configuration from JSON file."""
     try:
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
+        return CONFIG_STORE.load()
     except FileNotFoundError:
         messagebox.showerror("Error", f"Configuration file not found: {CONFIG_FILE}")
         return None
@@ -38,14 +47,12 @@ def load_config():
         return None
 
 def save_config(config):
-    """Save configuration to JSON file."""
-    try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
-        return True
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to save configuration: {e}")
-        return False
+    """Save configuration to JSON file.
+    
+    Saves made in quick succession are written once, a moment later, via a
+    temp file and rename; write errors are reported when that happens.
+    """
+    return CONFIG_STORE.save(config)
 
 def load_state():
     """Load organizer state from JSON file."""
@@ -53,7 +60,25 @@ def load_state():
         with open(STATE_FILE, 'r') as f:
             return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
-        return {"is_running": False, "run_in_background": False, "pid": None}
+        return {"run_in_background": False}
+
+def folder_path(folder):
+    """Full path of a monitored folder entry, as the organizer records it in the history."""
+    path = folder.get('path', '')
+    if folder.get('use_home_path', False):
+        path = os.path.join(os.path.expanduser('~'), path)
+    return path
+
+def folder_key(folder):
+    """Normalized full path of a monitored folder entry."""
+    return path_key(folder_path(folder))
+
+def path_key(path):
+    return os.path.normcase(os.path.normpath(path))
+
+def folder_iid(folder):
+    """Tree item id for a folder entry; stable for as long as the entry is in the config."""
+    return f"folder-{id(folder)}"
 
 def save_state(state):
     """Save organizer state to JSON file."""
@@ -65,16 +90,6 @@ def save_state(state):
         print(f"Failed to save state: {e}")
         return False
 
-def is_process_running(pid):
-    """Check if a process with given PID is running."""
-    if pid is None:
-        return False
-    try:
-        process = psutil.Process(pid)
-        return process.is_running() and process.status() != psutil.STATUS_ZOMBIE
-    except (psutil.NoSuchProcess, psutil.AccessDenied):
-        return False
-
 class FolderManagerGUI:
     def __init__(self, root):
         self.root = root
@@ -88,10 +103,24 @@ class FolderManagerGUI:
         # Organizer process tracking
         self.organizer_process = None
         self.status_check_thread = None
+        self.channel = None  # status socket to the running organizer
+        self.files_moved = 0
+        self.today_counts = {}  # folder path key -> files organized today
+        self.folder_items = {}  # tree item id -> folder entry in self.config
+        self.folder_rows = {}  # folder path key -> tree item id
+        self._fill_job = None
+        self.history = HistoryIndex(legacy_path=LEGACY_HISTORY_FILE)
+        self.history_filters = None  # filters of the search on screen; None until the tab is first opened
+        self.history_next = None  # before_id of the next page, None once the last page is shown
+        self.history_search = 0  # bumped per search so late pages of an old search are dropped
+        self.history_loading = False
+        self.history_total = 0
         self.is_running = False
         self.run_in_background = tk.BooleanVar(value=False)
         self.state = load_state()
         
+        CONFIG_STORE.on_error = lambda e: self.root.after(
+            0, lambda: messagebox.showerror("Error", f"Failed to save configuration: {e}"))
         self.config = load_config()
         if not self.config:
             self.root.destroy()
@@ -114,12 +143,20 @@ class FolderManagerGUI:
         main_tab = ttk.Frame(notebook)
         notebook.add(main_tab, text="📁 Folder Management")
         
+        # History tab
+        history_tab = ttk.Frame(notebook)
+        notebook.add(history_tab, text="🕘 History")
+        
         # Settings tab
         settings_tab = ttk.Frame(notebook)
         notebook.add(settings_tab, text="⚙️ Settings")
         
         self.setup_main_tab(main_tab)
+        self.setup_history_tab(history_tab)
         self.setup_settings_tab(settings_tab)
+        
+        # Load history the first time its tab is opened
+        notebook.bind("<<NotebookTabChanged>>", lambda e: self.on_tab_changed(notebook, history_tab))
     
     def setup_main_tab(self, parent):
         """Setup the main folder management tab."""
@@ -166,7 +203,7 @@ class FolderManagerGUI:
         folders_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
         # Create treeview for better display
-        columns = ("Status", "Name", "Path", "Type")
+        columns = ("Status", "Name", "Path", "Type", "Today")
         try:
             self.folder_tree = ttk.Treeview(folders_frame, columns=columns, show="headings", height=10)
 
@@ -175,11 +212,13 @@ class FolderManagerGUI:
             self.folder_tree.heading("Name", text="Folder Name")
             self.folder_tree.heading("Path", text="Path")
             self.folder_tree.heading("Type", text="Type")
+            self.folder_tree.heading("Today", text="Today")
 
             self.folder_tree.column("Status", width=100, anchor="center")
             self.folder_tree.column("Name", width=200)
             self.folder_tree.column("Path", width=300)
             self.folder_tree.column("Type", width=100, anchor="center")
+            self.folder_tree.column("Today", width=70, anchor="center")
 
             # Bind click events for checkbox functionality
             self.folder_tree.bind("<Button-1>", self.on_tree_click)
@@ -264,6 +303,181 @@ class FolderManagerGUI:
         
         ttk.Button(control_buttons_frame, text="📋 View Logs", 
                   command=self.view_logs).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(control_buttons_frame, text="🔬 Profile", 
+                  command=self.capture_profile).pack(side=tk.LEFT, padx=5)
+    
+    def setup_history_tab(self, parent):
+        """Setup the history tab: filters and a lazily paged list of moves."""
+        filter_frame = ttk.LabelFrame(parent, text="Find Moved Files", padding="10")
+        filter_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        ttk.Label(filter_frame, text="Category:").pack(side=tk.LEFT)
+        categories = ["All"] + list(self.config.get('file_types', {})) + ["Others"]
+        self.history_type = ttk.Combobox(filter_frame, values=categories, state="readonly", width=12)
+        self.history_type.set("All")
+        self.history_type.pack(side=tk.LEFT, padx=(5, 10))
+        
+        ttk.Label(filter_frame, text="Folder:").pack(side=tk.LEFT)
+        self.history_folder = ttk.Combobox(filter_frame, state="readonly", width=28,
+                                           postcommand=self.update_history_folders)
+        self.history_folder.set("All")
+        self.history_folder.pack(side=tk.LEFT, padx=(5, 10))
+        
+        ttk.Label(filter_frame, text="Name starts with:").pack(side=tk.LEFT)
+        self.history_name = ttk.Entry(filter_frame, width=16)
+        self.history_name.pack(side=tk.LEFT, padx=(5, 10))
+        self.history_name.bind("<Return>", lambda e: self.search_history())
+        
+        ttk.Button(filter_frame, text="🔍 Search", command=self.search_history).pack(side=tk.LEFT)
+        
+        results_frame = ttk.LabelFrame(parent, text="Moves, Newest First", padding="10")
+        results_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        columns = ("Date", "File", "Category", "Destination", "Folder")
+        self.history_tree = ttk.Treeview(results_frame, columns=columns, show="headings", height=15)
+        for column, width in zip(columns, (130, 200, 90, 200, 200)):
+            self.history_tree.heading(column, text=column)
+            self.history_tree.column(column, width=width)
+        
+        history_scroll = ttk.Scrollbar(results_frame, orient="vertical", command=self.history_tree.yview)
+        self.history_tree.configure(
+            yscrollcommand=lambda first, last: self.on_history_scroll(history_scroll, first, last))
+        self.history_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        history_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        history_actions = ttk.Frame(parent)
+        history_actions.pack(fill=tk.X, padx=10, pady=(0, 5))
+        self.history_status = ttk.Label(history_actions, text="", font=("Arial", 8), foreground="gray")
+        self.history_status.pack(side=tk.LEFT)
+        ttk.Button(history_actions, text="↩ Undo These Moves",
+                   command=self.undo_history).pack(side=tk.RIGHT)
+    
+    def on_tab_changed(self, notebook, history_tab):
+        if notebook.select() == str(history_tab) and self.history_filters is None:
+            self.search_history()
+    
+    def update_history_folders(self):
+        """Offer the currently configured folders in the folder filter."""
+        folders = [folder_path(folder) for folder in self.config.get('monitored_folders', [])]
+        self.history_folder['values'] = ["All"] + folders
+    
+    def search_history(self):
+        """Start a new history search from the filter fields."""
+        category = self.history_type.get()
+        folder = self.history_folder.get()
+        self.history_filters = {
+            "type": None if category == "All" else category,
+            "source_folder": None if folder == "All" else folder,
+            "name": self.history_name.get().strip() or None,
+        }
+        self.history_search += 1
+        self.history_next = None
+        self.history_loading = False
+        self.history_tree.delete(*self.history_tree.get_children())
+        self.history_status.config(text="Searching...")
+        self.load_history_page(first=True)
+    
+    def load_history_page(self, first=False):
+        """Fetch the next PAGE_SIZE matches on a background thread."""
+        if self.history_loading or (not first and self.history_next is None):
+            return
+        self.history_loading = True
+        search, filters, before = self.history_search, dict(self.history_filters), self.history_next
+        
+        def fetch():
+            records, total, error = [], None, None
+            try:
+                if first:
+                    self.history.refresh()  # index moves made since the last search
+                    total = self.history.count(**filters)
+                records = self.history.query(limit=PAGE_SIZE, before_id=before, **filters)
+            except Exception as e:
+                error = e
+            finally:
+                # Always hand back to the UI thread, which clears history_loading
+                self.root.after(0, lambda: self.finish_history_page(search, records, total, error))
+        
+        threading.Thread(target=fetch, daemon=True).start()
+    
+    def finish_history_page(self, search, records, total, error):
+        if search != self.history_search:
+            return  # a newer search replaced this one and reset the flag
+        try:
+            if error is not None:
+                self.history_next = None
+                self.history_status.config(text=f"Could not read the history: {error}")
+            else:
+                self.show_history_page(records, total)
+        finally:
+            self.history_loading = False
+    
+    def show_history_page(self, records, total):
+        for record in records:
+            self.history_tree.insert("", tk.END, values=(
+                record.get('date', ''), record.get('file', ''), record.get('type', ''),
+                record.get('destination', ''), record.get('source_folder', '')))
+        self.history_next = records[-1]["id"] if len(records) == PAGE_SIZE else None
+        if total is not None:
+            self.history_total = total
+        shown = len(self.history_tree.get_children())
+        self.history_status.config(text=f"Showing {shown} of {self.history_total} moves"
+                                   + (" - scroll down for more" if self.history_next is not None else ""))
+    
+    def undo_history(self):
+        """Plan putting back every move matching the current search, then confirm."""
+        if self.history_filters is None:
+            return
+        if self.is_running:
+            messagebox.showinfo("Info", "Stop the organizer before undoing moves, "
+                                        "or it would organize the files again.")
+            return
+        filters = dict(self.history_filters)
+        self.history_status.config(text="Checking which files can be put back...")
+        
+        def plan():
+            try:
+                result = plan_undo(self.history, **filters)
+            except Exception as e:
+                self.root.after(0, lambda err=e: messagebox.showerror("Error", f"Could not plan the undo: {err}"))
+                return
+            self.root.after(0, lambda: self.confirm_undo(result))
+        
+        threading.Thread(target=plan, daemon=True).start()
+    
+    def confirm_undo(self, plan):
+        self.history_status.config(text="")
+        if not plan.steps:
+            messagebox.showinfo("Nothing to Undo", plan.summary())
+            return
+        if not messagebox.askyesno("Confirm Undo", f"{plan.summary()}\n\n"
+                                   f"Put {len(plan.steps)} file(s) back where they came from?"):
+            return
+        
+        def progress(done, total):
+            self.root.after(0, lambda: self.history_status.config(text=f"Putting files back: {done}/{total}"))
+        
+        def work():
+            history = HistoryStore(HISTORY_FILE, legacy_path=LEGACY_HISTORY_FILE)
+            try:
+                restored, failed = run_undo(plan, history, progress=progress)
+            except Exception as e:
+                self.root.after(0, lambda err=e: messagebox.showerror("Error", f"Undo failed: {err}"))
+                return
+            finally:
+                history.close()
+            msg = f"Put back {restored} file(s)."
+            if failed:
+                msg += f"\n{len(failed)} could not be restored, e.g. {failed[0][0]['file']}: {failed[0][1]}"
+            self.root.after(0, lambda: (messagebox.showinfo("Undo Finished", msg), self.search_history()))
+        
+        threading.Thread(target=work, daemon=True).start()
+    
+    def on_history_scroll(self, scrollbar, first, last):
+        """Keep the scrollbar in step and fetch the next page when the end comes into view."""
+        scrollbar.set(first, last)
+        if float(last) >= 1.0 and self.history_next is not None:
+            self.load_history_page()
     
     def setup_settings_tab(self, parent):
         """Setup the settings tab."""
@@ -286,21 +500,20 @@ class FolderManagerGUI:
                 ttk.Label(category_frame, text=", ".join(extensions)).pack(side=tk.LEFT, padx=(10, 0))
     
     def refresh_folder_list(self):
-        """Refresh the folder list display."""
+        """Rebuild the folder list display from the configuration."""
 
         try:
-            # Clear existing items
-            for item in self.folder_tree.get_children():
-                self.folder_tree.delete(item)
+            if self._fill_job:
+                self.root.after_cancel(self._fill_job)
+                self._fill_job = None
 
-            # Add folders to treeview
-            for i, folder in enumerate(self.config.get('monitored_folders', [])):
-                status = "☑️" if folder.get('enabled', True) else "☐"
-                path = folder.get('path', '')
-                name = folder.get('name', path)
-                folder_type = "Home Folder" if folder.get('use_home_path', False) else "Custom Path"
+            # Clear existing items
+            self.folder_tree.delete(*self.folder_tree.get_children())
+            self.folder_items.clear()
+            self.folder_rows.clear()
 
-                self.folder_tree.insert('', 'end', values=(status, name, path, folder_type), tags=('clickable',))
+            # Add folders to treeview, a batch at a time
+            self._fill_rows(list(self.config.get('monitored_folders', [])))
 
             # Configure tag for clickable items
             self.folder_tree.tag_configure('clickable', foreground='blue', font=('Arial', 9, 'bold'))
@@ -308,6 +521,47 @@ class FolderManagerGUI:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to refresh folder list: {e}")
     
+    def _fill_rows(self, folders):
+        """Insert the first ROW_BATCH rows now and the rest when the panel is idle."""
+        for folder in folders[:ROW_BATCH]:
+            self.insert_folder_row(folder)
+        rest = folders[ROW_BATCH:]
+        self._fill_job = self.root.after_idle(self._fill_rows, rest) if rest else None
+    
+    def folder_row_values(self, folder):
+        status = "☑️" if folder.get('enabled', True) else "☐"
+        path = folder.get('path', '')
+        name = folder.get('name', path)
+        folder_type = "Home Folder" if folder.get('use_home_path', False) else "Custom Path"
+        today = self.today_counts.get(folder_key(folder), 0)
+        return (status, name, path, folder_type, today)
+    
+    def insert_folder_row(self, folder):
+        """Add one folder row; the item id stays tied to this config entry."""
+        item = self.folder_tree.insert('', 'end', iid=folder_iid(folder),
+                                       values=self.folder_row_values(folder), tags=('clickable',))
+        self.folder_items[item] = folder
+        self.folder_rows[folder_key(folder)] = item
+        return item
+    
+    def update_folder_row(self, folder):
+        """Redraw a single row in place."""
+        item = folder_iid(folder)
+        if self.folder_tree.exists(item):
+            self.folder_tree.item(item, values=self.folder_row_values(folder))
+    
+    def delete_folder_row(self, item):
+        folder = self.folder_items.pop(item)
+        self.folder_rows.pop(folder_key(folder), None)
+        self.folder_tree.delete(item)
+    
+    def selected_folder(self):
+        """Return (item, folder entry) for the current selection, or (None, None)."""
+        selection = self.folder_tree.selection()
+        if not selection:
+            return None, None
+        return selection[0], self.folder_items.get(selection[0])
+    
     def on_tree_click(self, event):
         """Handle clicks on the treeview."""
         # Get the item clicked
@@ -330,37 +584,26 @@ class FolderManagerGUI:
     
     def toggle_folder_from_tree(self, item):
         """Toggle folder status from treeview click."""
-        try:
-            # Get the index of the item
-            all_items = self.folder_tree.get_children()
-            index = all_items.index(item)
-            
-            # Get the folder configuration
-            folder = self.config['monitored_folders'][index]
-            folder['enabled'] = not folder.get('enabled', True)
+        folder = self.folder_items.get(item)
+        if folder is None:
+            messagebox.showerror("Error", "Could not find selected folder")
+            return
+        
+        folder['enabled'] = not folder.get('enabled', True)
+        
+        # Save configuration
+        if save_config(self.config):
+            # Update the display
+            self.update_folder_row(folder)
             
-            # Save configuration
-            if save_config(self.config):
-                # Update the display
-                self.refresh_folder_list()
-                
-                # Re-select the item
-                self.folder_tree.selection_set(item)
-                self.folder_tree.focus(item)
-                
-                # Show confirmation
-                status = "enabled" if folder['enabled'] else "disabled"
-                messagebox.showinfo("Status Changed", f"'{folder['name']}' is now {status}!")
-                
-                # If organizer is running, suggest restart
-                if self.is_running:
-                    result = messagebox.askyesno("Restart Required", 
-                                               "The organizer is currently running. Restart it to apply changes?")
-                    if result:
-                        self.restart_organizer()
+            # Re-select the item
+            self.folder_tree.selection_set(item)
+            self.folder_tree.focus(item)
             
-        except (ValueError, IndexError) as e:
-            messagebox.showerror("Error", f"Could not toggle folder status: {e}")
+            # Show confirmation
+            status = "enabled" if folder['enabled'] else "disabled"
+            messagebox.showinfo("Status Changed", f"'{folder['name']}' is now {status}!")
+            # A running organizer picks up config.json changes on its own
     
     def sort_by_status(self):
         """Sort folders by status (enabled first)."""
@@ -371,7 +614,12 @@ class FolderManagerGUI:
         self.config['monitored_folders'].sort(key=lambda x: not x.get('enabled', True))
         
         if save_config(self.config):
-            self.refresh_folder_list()
+            if self._fill_job:
+                self.refresh_folder_list()
+                return
+            # Reorder the existing rows instead of rebuilding them
+            for index, folder in enumerate(self.config['monitored_folders']):
+                self.folder_tree.move(folder_iid(folder), '', index)
     
     def add_common_folder(self, folder_name):
         """Add a common folder (Downloads, Desktop, etc.) to monitoring."""
@@ -395,7 +643,7 @@ class FolderManagerGUI:
         self.config['monitored_folders'].append(new_folder)
         
         if save_config(self.config):
-            self.refresh_folder_list()
+            self.folder_tree.see(self.insert_folder_row(new_folder))
             messagebox.showinfo("Success", f"✅ {folder_name} folder added and enabled for monitoring!")
     
     def add_folder(self):
@@ -446,55 +694,38 @@ class FolderManagerGUI:
         self.config['monitored_folders'].append(new_folder)
         
         if save_config(self.config):
-            self.refresh_folder_list()
+            self.folder_tree.see(self.insert_folder_row(new_folder))
             messagebox.showinfo("Success", f"✅ {name} added and enabled for monitoring!")
     
     def remove_folder(self):
-        selection = self.folder_tree.selection()
-        if not selection:
+        item, folder = self.selected_folder()
+        if item is None:
             messagebox.showwarning("Warning", "Please select a folder to remove")
             return
-        
-        # Get the selected item
-        item = selection[0]
-        
-        # Find the index of this item in the treeview
-        all_items = self.folder_tree.get_children()
-        try:
-            index = all_items.index(item)
-        except ValueError:
+        if folder is None:
             messagebox.showerror("Error", "Could not find selected folder")
             return
-            
-        folder = self.config['monitored_folders'][index]
         
         result = messagebox.askyesno("Confirm", 
                                    f"Remove folder '{folder['name']}' from monitoring?")
         if result:
-            del self.config['monitored_folders'][index]
+            folders = self.config['monitored_folders']
+            # Remove this exact entry, not one that merely compares equal
+            index = next(i for i, entry in enumerate(folders) if entry is folder)
+            del folders[index]
             if save_config(self.config):
-                self.refresh_folder_list()
+                self.delete_folder_row(item)
                 messagebox.showinfo("Success", "🗑️ Folder removed from monitoring")
 
     def toggle_folder(self, enable_state=None):
         """Toggle enable/disable status of selected folder."""
-        selection = self.folder_tree.selection()
-        if not selection:
+        item, folder = self.selected_folder()
+        if item is None:
             messagebox.showwarning("Warning", "Please select a folder to enable/disable")
             return
-        
-        # Get the selected item
-        item = selection[0]
-        
-        # Find the index of this item in the treeview
-        all_items = self.folder_tree.get_children()
-        try:
-            index = all_items.index(item)
-        except ValueError:
+        if folder is None:
             messagebox.showerror("Error", "Could not find selected folder")
             return
-            
-        folder = self.config['monitored_folders'][index]
         
         if enable_state is not None:
             folder['enabled'] = enable_state
@@ -502,58 +733,41 @@ class FolderManagerGUI:
             folder['enabled'] = not folder.get('enabled', True)
         
         if save_config(self.config):
-            self.refresh_folder_list()
+            self.update_folder_row(folder)
             status = "✅ enabled" if folder['enabled'] else "❌ disabled"
             messagebox.showinfo("Success", f"Folder '{folder['name']}' is now {status}!")
-            
-            # If organizer is running, suggest restart
-            if self.is_running:
-                result = messagebox.askyesno("Restart Required", 
-                                           "The organizer is currently running. Restart it to apply changes?")
-                if result:
-                    self.restart_organizer()
     
     def enable_all_folders(self):
         """Enable all monitored folders."""
         if 'monitored_folders' not in self.config:
             return
             
-        changed = False
+        changed = []
         for folder in self.config['monitored_folders']:
             if not folder.get('enabled', True):
                 folder['enabled'] = True
-                changed = True
+                changed.append(folder)
         
         if changed and save_config(self.config):
-            self.refresh_folder_list()
+            for folder in changed:
+                self.update_folder_row(folder)
             messagebox.showinfo("Success", "All folders have been enabled!")
-            
-            if self.is_running:
-                result = messagebox.askyesno("Restart Required", 
-                                           "The organizer is currently running. Restart it to apply changes?")
-                if result:
-                    self.restart_organizer()
     
     def disable_all_folders(self):
         """Disable all monitored folders."""
         if 'monitored_folders' not in self.config:
             return
             
-        changed = False
+        changed = []
         for folder in self.config['monitored_folders']:
             if folder.get('enabled', True):
                 folder['enabled'] = False
-                changed = True
+                changed.append(folder)
         
         if changed and save_config(self.config):
-            self.refresh_folder_list()
+            for folder in changed:
+                self.update_folder_row(folder)
             messagebox.showinfo("Success", "All folders have been disabled!")
-            
-            if self.is_running:
-                result = messagebox.askyesno("Restart Required", 
-                                           "The organizer is currently running. Restart it to apply changes?")
-                if result:
-                    self.restart_organizer()
     
     def start_organizer(self):
         """Start the file organizer in the background."""
@@ -567,6 +781,10 @@ class FolderManagerGUI:
             messagebox.showwarning("Warning", "No folders are enabled for monitoring! Please enable at least one folder.")
             return
         
+        # The organizer reads config.json on start, so write out any batched edits first
+        if not CONFIG_STORE.flush():
+            return
+        
         try:
             # Start the main organizer script
             # Use DETACHED_PROCESS for true background execution on Windows
@@ -588,17 +806,15 @@ class FolderManagerGUI:
                 )
             
             self.is_running = True
+            self.files_moved = 0
             
-            # Save state with PID
-            self.state['is_running'] = True
             self.state['run_in_background'] = self.run_in_background.get()
-            self.state['pid'] = self.organizer_process.pid
             save_state(self.state)
             
             self.update_ui_status()
             
             # Start status monitoring
-            self.start_status_monitoring()
+            self.start_status_monitoring(self.organizer_process)
             
             folder_names = [f['name'] for f in enabled_folders]
             bg_msg = "\n\n⚠️ Background mode: Organizer will continue running even after closing this window." if self.run_in_background.get() else ""
@@ -607,94 +823,138 @@ class FolderManagerGUI:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start organizer: {e}")
     
-    def stop_organizer(self):
-        """Stop the file organizer."""
+    def stop_organizer(self, then=None):
+        """Stop the file organizer.
+        
+        The wait for it to exit happens on a background thread, so the window
+        stays responsive. then(), if given, runs once it has exited instead of
+        the confirmation message.
+        """
         if not self.is_running:
             messagebox.showinfo("Info", "Organizer is not running!")
             return
         
         try:
-            # Try to terminate the process
-            if self.organizer_process:
-                self.organizer_process.terminate()
-                try:
-                    self.organizer_process.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    self.organizer_process.kill()
-            elif self.state.get('pid'):
-                # Try to kill by PID if process object is not available
-                try:
-                    process = psutil.Process(self.state['pid'])
-                    process.terminate()
-                    process.wait(timeout=5)
-                except (psutil.NoSuchProcess, psutil.TimeoutExpired):
-                    pass
-            
-            self.is_running = False
-            self.organizer_process = None
-            
-            # Update state
-            self.state['is_running'] = False
-            self.state['pid'] = None
-            save_state(self.state)
-            
-            self.update_ui_status()
-            
-            messagebox.showinfo("Success", "🔴 Organizer stopped!")
+            process = self.organizer_process
+            info = read_pid_file()
+            if process is None and info:
+                process = psutil.Process(info['pid'])
             
+            # Ask for a clean shutdown so in-flight moves finish; terminate as a fallback
+            try:
+                send_command(self.channel, 'stop')
+            except (OSError, AttributeError):
+                if process:
+                    process.terminate()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to stop organizer: {e}")
+            return
+        
+        self.stop_button.config(state="disabled")
+        self.status_label.config(text="🟡 Stopping...", foreground="orange")
+        
+        def wait():
+            error = None
+            if process:
+                try:
+                    process.wait(timeout=STOP_TIMEOUT)
+                except (subprocess.TimeoutExpired, psutil.TimeoutExpired):
+                    process.kill()
+                except psutil.NoSuchProcess:
+                    pass
+                except Exception as e:
+                    error = e
+            self.root.after(0, self.on_organizer_stop_finished, error, then)
+        
+        threading.Thread(target=wait, daemon=True).start()
     
-    def restart_organizer(self):
-        """Restart the organizer to apply configuration changes."""
-        if self.is_running:
-            self.stop_organizer()
-            time.sleep(1)
-        self.start_organizer()
+    def on_organizer_stop_finished(self, error, then):
+        """The organizer stopped (or was killed) after stop_organizer()."""
+        self.is_running = False
+        self.organizer_process = None
+        self.update_ui_status()
+        if then:
+            then()
+        elif error:
+            messagebox.showerror("Error", f"Failed to stop organizer: {error}")
+        else:
+            messagebox.showinfo("Success", "🔴 Organizer stopped!")
     
     def check_organizer_status(self):
-        """Check if organizer is currently running based on saved state."""
-        # Check if there's a saved PID and if that process is still running
-        saved_pid = self.state.get('pid')
-        if saved_pid and is_process_running(saved_pid):
+        """Check if an organizer is already running, e.g. one left in background mode."""
+        # The PID file records the organizer's start time, so a reused PID is not mistaken for it
+        if read_pid_file():
             self.is_running = True
-            # Try to get the process object
-            try:
-                self.organizer_process = psutil.Process(saved_pid)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                self.organizer_process = None
-            
-            # Start monitoring
             self.start_status_monitoring()
         else:
             self.is_running = False
-            # Clean up stale state
-            if self.state.get('is_running'):
-                self.state['is_running'] = False
-                self.state['pid'] = None
-                save_state(self.state)
         
         self.update_ui_status()
     
-    def start_status_monitoring(self):
-        """Start monitoring the organizer process status."""
+    def start_status_monitoring(self, process=None):
+        """Follow the organizer over its status channel.
+        
+        The thread blocks on the socket and the organizer pushes updates, so
+        nothing is polled while idle; the socket closing means it has exited.
+        """
         def monitor():
-            while self.is_running:
-                # Check if process is still running
-                pid = self.state.get('pid')
-                if not is_process_running(pid):
-                    # Process has ended
-                    self.is_running = False
-                    self.state['is_running'] = False
-                    self.state['pid'] = None
-                    save_state(self.state)
-                    self.root.after(0, self.update_ui_status)
+            info = read_pid_file()
+            deadline = time.monotonic() + STARTUP_TIMEOUT
+            # A freshly started organizer needs a moment to take its lock
+            while process is not None and (info is None or info['pid'] != process.pid):
+                if process.poll() is not None or time.monotonic() > deadline:
+                    info = None
                     break
-                time.sleep(2)
+                time.sleep(0.1)
+                info = read_pid_file()
+            
+            if info and info.get('port'):
+                try:
+                    self.channel = connect(info)
+                except OSError:
+                    self.channel = None
+                if self.channel:
+                    for message in iter_messages(self.channel):
+                        self.root.after(0, self.on_organizer_message, message)
+            self.channel = None
+            self.root.after(0, self.on_organizer_stopped)
         
         self.status_check_thread = threading.Thread(target=monitor, daemon=True)
         self.status_check_thread.start()
     
+    def on_organizer_message(self, message):
+        """Handle an update pushed by the organizer."""
+        event = message.get('event')
+        if event in ('hello', 'status', 'stats'):
+            self.files_moved = sum(message.get('moved', {}).values())
+            old_counts = self.today_counts
+            self.today_counts = {}
+            for path, count in message.get('today', {}).items():
+                # The same folder may be counted under more than one spelling of its path
+                key = path_key(path)
+                self.today_counts[key] = self.today_counts.get(key, 0) + count
+            for key in set(old_counts) | set(self.today_counts):
+                if old_counts.get(key) != self.today_counts.get(key):
+                    self.update_today_cell(key)
+        elif event == 'moved':
+            self.files_moved += 1
+            if message.get('source_folder'):
+                key = path_key(message['source_folder'])
+                self.today_counts[key] = self.today_counts.get(key, 0) + 1
+                self.update_today_cell(key)
+        self.update_ui_status()
+    
+    def update_today_cell(self, key):
+        item = self.folder_rows.get(key)
+        if item and self.folder_tree.exists(item):
+            self.folder_tree.set(item, "Today", self.today_counts.get(key, 0))
+    
+    def on_organizer_stopped(self):
+        """The status channel closed: the organizer has exited."""
+        self.is_running = False
+        self.organizer_process = None
+        self.update_ui_status()
+    
     def on_background_toggle(self):
         """Handle background run checkbox toggle."""
         self.state['run_in_background'] = self.run_in_background.get()
@@ -710,7 +970,8 @@ class FolderManagerGUI:
         """Update the UI to reflect current organizer status."""
         if self.is_running:
             bg_indicator = " (Background)" if self.state.get('run_in_background') else ""
-            self.status_label.config(text=f"🟢 Running{bg_indicator}", foreground="green")
+            moved = f" - {self.files_moved} files organized" if self.files_moved else ""
+            self.status_label.config(text=f"🟢 Running{bg_indicator}{moved}", foreground="green")
             self.start_button.config(state="disabled")
             self.stop_button.config(state="normal")
         else:
@@ -735,6 +996,27 @@ class FolderManagerGUI:
                 messagebox.showerror("Error", f"Could not open log file: {e}")
         else:
             messagebox.showinfo("Info", "No log file found. Start the organizer to generate logs.")
+    
+    def capture_profile(self):
+        """Ask the running organizer for a 10 second profile."""
+        if not self.is_running:
+            messagebox.showinfo("Info", "Start the organizer before capturing a profile.")
+            return
+        port = self.config.get('metrics_port', 8765)
+        url = f"http://127.0.0.1:{port}/profile?seconds=10"
+        
+        def capture():
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    result = json.loads(response.read().decode('utf-8'))
+                msg = (f"Flamegraph stacks: {result['flamegraph']}\n"
+                       f"Stage timings: {result['stages']}")
+                self.root.after(0, lambda: messagebox.showinfo("Profile Captured", msg))
+            except Exception as e:
+                self.root.after(0, lambda err=e: messagebox.showerror("Error", f"Could not capture profile: {err}"))
+        
+        threading.Thread(target=capture, daemon=True).start()
+        messagebox.showinfo("Profiling", "Sampling the organizer for 10 seconds...")
 
 def main():
     """Main function to run the folder manager."""
@@ -758,13 +1040,15 @@ def main():
                                            "The organizer is running in background mode and will continue running.\n\n"
                                            "Do you want to stop it before closing?")
                 if result:
-                    app.stop_organizer()
+                    app.stop_organizer(then=root.destroy)
+                    return
             else:
                 # Normal mode - ask to stop
                 result = messagebox.askyesno("Confirm Exit", 
                                            "The organizer is still running. Stop it before closing?")
                 if result:
-                    app.stop_organizer()
+                    app.stop_organizer(then=root.destroy)
+                    return
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -0,0 +1,220 @@
+"""
+History index for Silent Organizer
+SQLite sidecar over the JSON Lines history for filtered, paginated queries
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from history_store import HistoryStore, HISTORY_FILE
+
+HISTORY_INDEX_FILE = os.path.join(os.path.expanduser('~'), 'FileOrganizer_history.sqlite3')
+SCHEMA_VERSION = 3  # bump to rebuild existing indexes after a schema change
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+INDEX_BATCH = 5000  # records per transaction while catching up
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    date TEXT,
+    type TEXT,
+    source_folder TEXT,
+    folder TEXT,
+    file TEXT COLLATE NOCASE,
+    kind TEXT,
+    offset INTEGER
+);
+CREATE INDEX IF NOT EXISTS records_date ON records (date);
+CREATE INDEX IF NOT EXISTS records_type ON records (type);
+CREATE INDEX IF NOT EXISTS records_folder ON records (folder, type);
+CREATE INDEX IF NOT EXISTS records_file ON records (file);
+CREATE INDEX IF NOT EXISTS records_kind ON records (kind);
+"""
+
+def record_kind(record):
+    """'undo' for a compensating record, the duplicate_action for a duplicate, else None (a move)."""
+    return 'undo' if 'undo' in record else record.get('duplicate')
+
+def folder_key(path):
+    """How a source folder is indexed and matched: 'F:/semester 1' and 'f:\\semester 1' are one folder."""
+    return os.path.normcase(os.path.normpath(path)) if path else path
+
+def _like_prefix(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+class HistoryIndex:
+    """Queryable copy of the history log, kept in step with it incrementally.
+
+    The JSON Lines file stays the source of truth. refresh() indexes only
+    the lines appended since the last call, remembering the byte offset it
+    reached and the file's inode, and rebuilds from scratch if the log was
+    replaced or truncated. A legacy_path JSON history is converted first,
+    so an upgrade does not show an empty history until the next move. Only
+    the filter columns and each record's offset in the log are stored;
+    results are read back from the log.
+
+    Rows are numbered in log order, so pages are fetched newest first with
+    `id < before_id` and never by OFFSET, and a page costs the same at
+    record ten million as at record ten. Safe to use from several threads
+    and from the organizer and the control panel at once (SQLite does the
+    locking between processes).
+    """
+
+    def __init__(self, path=HISTORY_INDEX_FILE, history_path=HISTORY_FILE, legacy_path=None):
+        self.path = path
+        self.history_path = history_path
+        self.legacy_path = legacy_path
+        self._migrated = False
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)')
+            row = db.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            if row is None or row[0] != SCHEMA_VERSION:
+                db.execute('BEGIN IMMEDIATE')
+                db.execute('DROP TABLE IF EXISTS records')
+                db.execute('DELETE FROM meta')
+                db.execute("INSERT INTO meta VALUES ('schema', ?)", (SCHEMA_VERSION,))
+                db.execute('COMMIT')
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    @staticmethod
+    def _meta(db, key, default=None):
+        row = db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def refresh(self):
+        """Index records appended to the history since the last refresh; returns how many."""
+        if not self._migrated:
+            self._migrated = True
+            try:
+                HistoryStore(self.history_path, legacy_path=self.legacy_path).migrate()
+            except OSError:
+                pass  # the organizer got there first
+        try:
+            st = os.stat(self.history_path)
+        except OSError:
+            return 0
+        added = 0
+        with self._lock:
+            db = self._connect()
+            with open(self.history_path, 'rb') as f:
+                while True:
+                    db.execute('BEGIN IMMEDIATE')
+                    try:
+                        offset = self._meta(db, 'offset', 0)
+                        if self._meta(db, 'inode') != st.st_ino or offset > st.st_size:
+                            db.execute('DELETE FROM records')  # log replaced or truncated
+                            db.execute("INSERT OR REPLACE INTO meta VALUES ('inode', ?)", (st.st_ino,))
+                            offset = 0
+                        f.seek(offset)
+                        rows = []
+                        while len(rows) < INDEX_BATCH:
+                            line = f.readline()
+                            if not line.endswith(b'\n'):
+                                break  # end of file, or a line still being written
+                            start, offset = offset, offset + len(line)
+                            try:
+                                record = json.loads(line)
+                            except ValueError:
+                                continue  # torn line from an interrupted write
+                            if not isinstance(record, dict):
+                                continue
+                            rows.append((record.get('date'), record.get('type'), record.get('source_folder'),
+                                         folder_key(record.get('source_folder')), record.get('file'),
+                                         record_kind(record), start))
+                        db.executemany('INSERT INTO records (date, type, source_folder, folder, file, kind, offset) '
+                                       'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+                        db.execute("INSERT OR REPLACE INTO meta VALUES ('offset', ?)", (offset,))
+                        db.execute('COMMIT')
+                    except BaseException:
+                        db.execute('ROLLBACK')
+                        raise
+                    added += len(rows)
+                    if len(rows) < INDEX_BATCH:
+                        return added
+
+    @staticmethod
+    def _where(since=None, until=None, type=None, source_folder=None, name=None, kind=None, before_id=None):
+        """SQL condition and parameters; since is inclusive, until exclusive ('YYYY-MM-DD[ HH:MM:SS]')."""
+        clauses, params = [], []
+        for clause, value in (('date >= ?', since), ('date < ?', until), ('type = ?', type),
+                              ('folder = ?', folder_key(source_folder)), ('kind = ?', kind), ('id < ?', before_id)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        if name:
+            clauses.append("file LIKE ? ESCAPE '\\'")
+            params.append(_like_prefix(name))
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query(self, limit=PAGE_SIZE, **filters):
+        """One page of matching records, newest first.
+
+        Filters are since, until, type, source_folder (any spelling of the
+        folder's path, see folder_key()), name (a file name prefix,
+        case-insensitive), kind (see record_kind()) and before_id. Each
+        record gets its row "id"; pass the last one as before_id to fetch
+        the next page.
+        """
+        where, params = self._where(**filters)
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        with self._lock:
+            rows = self._connect().execute(
+                f'SELECT id, offset FROM records{where} ORDER BY id DESC LIMIT ?', params + [limit]).fetchall()
+        return self._read(rows)
+
+    def _read(self, rows):
+        """Load the (id, offset) rows' records from the log itself."""
+        records = []
+        if not rows:
+            return records
+        with open(self.history_path, 'rb') as f:
+            for row_id, offset in rows:
+                f.seek(offset)
+                try:
+                    record = json.loads(f.readline())
+                except ValueError:
+                    continue  # the log was replaced since the last refresh
+                record["id"] = row_id
+                records.append(record)
+        return records
+
+    def iter_records(self, page_size=MAX_PAGE_SIZE, **filters):
+        """Every matching record, newest first, fetched a page at a time."""
+        before_id = filters.pop('before_id', None)
+        while True:
+            records = self.query(limit=page_size, before_id=before_id, **filters)
+            yield from records
+            if len(records) < page_size:
+                return
+            before_id = records[-1]["id"]
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        with self._lock:
+            return self._connect().execute(f'SELECT COUNT(*) FROM records{where}', params).fetchone()[0]
+
+    def counts_by_folder(self, since=None, until=None):
+        """{source_folder: records} for a date range, one entry per folder however it was spelled."""
+        where, params = self._where(since=since, until=until)
+        with self._lock:
+            rows = self._connect().execute(
+                f'SELECT MAX(source_folder), COUNT(*) FROM records{where} GROUP BY folder', params).fetchall()
+        return {os.path.normpath(folder) if folder else folder: count for folder, count in rows}
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,129 @@
+"""
+History store for Silent Organizer
+Append-only JSON Lines log of every file the organizer moves
+"""
+
+import os
+import json
+import time
+import threading
+
+HISTORY_FILE = os.path.join(os.path.expanduser('~'), 'FileOrganizer_history.jsonl')
+# Older versions rewrote a single JSON array on every move
+LEGACY_HISTORY_FILE = os.path.join(os.path.expanduser('~'), 'FileOrganizer_history.json')
+
+class HistoryStore:
+    """Append one JSON object per line; never rewrite existing records.
+
+    Every record is flushed to the OS as soon as it is written, but fsync is
+    batched: it runs once `fsync_every` records have accumulated or
+    `fsync_interval` seconds have passed since the last sync, and on close().
+    A timer started by the first unsynced record makes sure the interval
+    holds even when no further record arrives after a burst.
+    """
+
+    def __init__(self, path, legacy_path=None, fsync_every=50, fsync_interval=5.0):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._timer = None
+        self._migrated = False
+
+    def migrate(self):
+        """Convert the legacy JSON array file into JSON Lines, once."""
+        if self._migrated:
+            return
+        self._migrated = True
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        if os.path.exists(self.path):
+            return  # already migrated by an earlier run
+
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(records, list):
+            return
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # Keep the old file around, but out of the way
+        os.replace(self.legacy_path, self.legacy_path + '.migrated')
+
+    def _open(self):
+        if self._file is None:
+            self.migrate()
+            # A crash mid-write can leave a torn last line; start on a fresh one
+            torn = False
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b'\n'
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if torn:
+                self._file.write('\n')
+        return self._file
+
+    def append(self, record):
+        """Append a single history record."""
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            f = self._open()
+            f.write(line)
+            f.flush()
+            self._unsynced += 1
+            now = time.monotonic()
+            if self._unsynced >= self.fsync_every or now - self._last_sync >= self.fsync_interval:
+                os.fsync(f.fileno())
+                self._unsynced = 0
+                self._last_sync = now
+            elif self._timer is None:
+                self._timer = threading.Timer(self.fsync_interval - (now - self._last_sync), self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def iter_records(self):
+        """Yield records oldest first without loading the whole file."""
+        self.migrate()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn line from an interrupted write
+
+    def sync(self):
+        """Force any batched records to disk."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._file is not None and self._unsynced:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+                self._last_sync = time.monotonic()
+
+    def close(self):
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
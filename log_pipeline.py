@@ -0,0 +1,132 @@
+"""
+Logging pipeline for Silent Organizer
+Queue-based, batched, rotating log output so logging never waits on the disk
+"""
+
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+RATE_LIMIT_SECONDS = 30
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that leaves flushing to BatchingQueueListener."""
+
+    def flush(self):
+        pass
+
+    def flush_now(self):
+        super().flush()
+
+    def close(self):
+        self.flush_now()
+        super().close()
+
+class BatchingQueueListener(QueueListener):
+    """Write records as they arrive but flush only when the queue runs dry.
+
+    A burst of records therefore costs one flush instead of one per line.
+    """
+
+    def dequeue(self, block):
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                getattr(handler, 'flush_now', handler.flush)()
+        return self.queue.get(block)
+
+class RateLimitFilter(logging.Filter):
+    """Let a record with a `rate_key` through at most once per interval.
+
+    Used for lines that repeat while the organizer waits on something, e.g.
+    logging.info(msg, extra={'rate_key': ('waiting', path)}). Records without
+    a rate_key are never filtered.
+    """
+
+    def __init__(self, interval=RATE_LIMIT_SECONDS):
+        super().__init__()
+        self.interval = interval
+        self._last = {}
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record):
+        key = getattr(record, 'rate_key', None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                self.suppressed += 1
+                return False
+            self._last[key] = now
+            if len(self._last) > 10000:
+                cutoff = now - self.interval
+                self._last = {k: t for k, t in self._last.items() if t >= cutoff}
+        return True
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line, for feeding logs to other tools."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+_LISTENER = None
+
+def setup_logging(log_file, log_format='text', max_bytes=DEFAULT_MAX_BYTES,
+                  backup_count=DEFAULT_BACKUP_COUNT, level=logging.INFO):
+    """Route the root logger through a queue to a rotating, batched file writer.
+
+    Safe to call again (e.g. once the config is loaded); the previous
+    listener is drained and replaced.
+    """
+    global _LISTENER
+    shutdown_logging()
+
+    file_handler = BufferedRotatingFileHandler(log_file, maxBytes=max_bytes,
+                                               backupCount=backup_count, encoding='utf-8')
+    if log_format == 'json':
+        file_handler.setFormatter(JsonLinesFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.Queue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _LISTENER = BatchingQueueListener(log_queue, file_handler)
+    _LISTENER.start()
+    return _LISTENER
+
+def shutdown_logging():
+    """Drain the queue and close the log file."""
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        for handler in _LISTENER.handlers:
+            handler.close()
+        _LISTENER = None
+
+atexit.register(shutdown_logging)
@@ -2,21 +2,40 @@ import os
 import sys
 import json
 import time
-import shutil
+import re
+import heapq
+import signal
+import fnmatch
+import atexit
 import logging
+import threading
+import functools
 from datetime import datetime
+from types import MappingProxyType
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import watchdog.events
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from history_store import HistoryStore, HISTORY_FILE, LEGACY_HISTORY_FILE
+from history_index import HistoryIndex, PAGE_SIZE, MAX_PAGE_SIZE
+from undo import RestoredFiles
+from move_engine import TransferJournal, DestinationNames, move_file, resume_transfers
+from log_pipeline import setup_logging, DEFAULT_MAX_BYTES, DEFAULT_BACKUP_COUNT
+from metrics import Registry, MetricsServer, BadRequest
+from profiling import StageProfiler, dump_profile
+from supervisor import PidLock, StatusChannel, AlreadyRunning
+from config_store import VERSION_KEY
+from content_types import ContentSniffer
+from duplicates import DuplicateFinder, link_duplicate, DUPLICATE_ACTIONS, DEFAULT_DUPLICATE_ACTION
+from tree_scan import (ExcludeMatcher, ScanIndex, scan_files, count_dirs, DEFAULT_IGNORE_PATTERNS,
+                       DEFAULT_MAX_WATCH_DIRS)
 
 # --- LOGGING SETUP ---
 # This creates a log file in your main user folder (e.g., C:\Users\kodur\FileOrganizer.log)
+# Records go through a queue to a background writer that batches and rotates the file.
 LOG_FILE = os.path.join(os.path.expanduser('~'), 'FileOrganizer.log')
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    force=True
-)
+setup_logging(LOG_FILE)
 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller. """
@@ -28,95 +47,923 @@ def resource_path(relative_path):
 
 # --- CONFIGURATION AND SETUP ---
 CONFIG_FILE = resource_path('config.json')
-HISTORY_FILE = os.path.join(os.path.expanduser('~'), 'FileOrganizer_history.json')
-PROCESSED_FILES = set()
-OBSERVERS = []  # Store multiple observers
+HISTORY = HistoryStore(HISTORY_FILE, legacy_path=LEGACY_HISTORY_FILE)
+atexit.register(HISTORY.close)
+# SQLite sidecar for /history queries, caught up on demand
+HISTORY_INDEX = HistoryIndex(legacy_path=LEGACY_HISTORY_FILE)
+atexit.register(HISTORY_INDEX.close)
+RESTORED_FILES = RestoredFiles()  # files put back by undo.py, loaded at start
+RESTORED_FILES_LOADED = threading.Event()  # the startup scans wait for it
+
+# --- METRICS ---
+METRICS = Registry()
+EVENTS_RECEIVED = METRICS.counter('organizer_events_received_total', 'Filesystem events received')
+FILES_MOVED = METRICS.counter('organizer_files_moved_total', 'Files moved, by category', ('category',))
+BYTES_MOVED = METRICS.counter('organizer_bytes_moved_total', 'Bytes moved into category folders')
+STABILITY_WAIT = METRICS.histogram('organizer_stability_wait_seconds',
+                                   'Time from queueing a file until it was stable')
+MOVE_DURATION = METRICS.histogram('organizer_move_duration_seconds', 'Time spent moving one file')
+DUPLICATES_FOUND = METRICS.counter('organizer_duplicates_total', 'Incoming files identical to one already organized, '
+                                   'by duplicate_action', ('action',))
+FILES_SNIFFED = METRICS.counter('organizer_files_sniffed_total', 'Files classified by content, by whether a '
+                                'configured category matched', ('result',))
+METRICS.gauge('organizer_duplicate_hashed_bytes', 'Bytes read to compare possible duplicates',
+              lambda: DUPLICATES.hashed_bytes)
+METRICS.gauge('organizer_dedup_hits', 'Events skipped because the file was already handled',
+              lambda: PROCESSED_FILES.hits)
+METRICS.gauge('organizer_dedup_evictions', 'Entries evicted from the processed-file cache',
+              lambda: PROCESSED_FILES.evictions)
+METRICS.gauge('organizer_coalescer_pending', 'Paths waiting for their events to go quiet',
+              lambda: COALESCER.stats()["pending"] if COALESCER else 0)
+METRICS.gauge('organizer_stability_pending', 'Files waiting to stop changing',
+              lambda: SCHEDULER.pending_count() if SCHEDULER else 0)
+METRICS.gauge('organizer_mover_queue_depth', 'Move jobs queued or running',
+              lambda: WORKERS.outstanding() if WORKERS else 0)
+DEFAULT_METRICS_PORT = 8765
+DEFAULT_METRICS_SNAPSHOT_INTERVAL = 60  # seconds
+
+# --- PROFILING ---
+# Per-stage timings of _move_file; enable with "profiling": true or ORGANIZER_PROFILE=1
+PROFILE_ENV = os.environ.get('ORGANIZER_PROFILE', '') not in ('', '0')
+PROFILER = StageProfiler(enabled=PROFILE_ENV)
+OBSERVER = None  # One shared Observer; every monitored folder is a watch on it
+ROUTER = None    # The single DownloadHandler that routes events to their folder
+WATCHES = {}     # folder path -> ObservedWatch
+WATCH_MODES = {}  # folder path -> recursive flag the watch was started with
+WATCH_LOCK = threading.Lock()  # scan threads upgrade watches while the config reloader edits them
+CONFIG_RELOAD_DELAY = 0.5  # Seconds of quiet after a config.json write before reloading
+STABILITY_INTERVAL = 2  # Seconds a file's size and mtime must hold still
+DEFAULT_STABILITY_MAX_INTERVAL = 30  # Longest re-check wait for a file that keeps changing
+DEFAULT_PARTIAL_SUFFIXES = ('.tmp', '.crdownload', '.part', '.partial', '.download', '.opdownload')
+DEFAULT_LOCK_PATTERNS = ('~$*', '.~lock.*#')
+DEFAULT_SNIFF_CONTENT = True  # Look inside files whose extension gives no category
+DEFAULT_WORKER_THREADS = 4
+DEFAULT_MAX_QUEUED_JOBS = 1000
+DEFAULT_PROCESSED_MAX = 100000
+DEFAULT_PROCESSED_TTL = 24 * 3600  # seconds
+DEFAULT_COALESCE_WINDOW = 0.5  # Seconds of quiet before a file's events are emitted
+
+class ProcessedFiles:
+    """Bounded, expiring record of paths the organizer has already handled.
+
+    An LRU dict keyed by path that also remembers the file's inode and
+    mtime, so a new file that reuses an old name is processed again.
+    Entries expire after `ttl` seconds and the oldest are evicted beyond
+    `max_size`. The counters in stats() help size it.
+    """
+
+    def __init__(self, max_size=DEFAULT_PROCESSED_MAX, ttl=DEFAULT_PROCESSED_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # path -> (identity, expires)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _identity(path, st=None):
+        try:
+            if st is None:
+                st = os.stat(path)
+            return (st.st_ino, st.st_mtime_ns)
+        except OSError:
+            return None
+
+    def resize(self, max_size, ttl):
+        with self._lock:
+            self.max_size = max_size
+            self.ttl = ttl
+            self._evict()
+
+    def add(self, path, st=None):
+        identity = self._identity(path, st)
+        with self._lock:
+            if identity is None:
+                # Gone already: an entry without an identity would hide any
+                # new file created under this name until it expired
+                self._entries.pop(path, None)
+                return
+            self._entries[path] = (identity, time.monotonic() + self.ttl)
+            self._entries.move_to_end(path)
+            self._evict()
+
+    def contains(self, path, st=None):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self.misses += 1
+                return False
+            identity, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[path]
+                self.expirations += 1
+                self.misses += 1
+                return False
+        if identity is not None:
+            current = self._identity(path, st)
+            if current is not None and current != identity:
+                # Same name, different file
+                with self._lock:
+                    self._entries.pop(path, None)
+                    self.misses += 1
+                return False
+        with self._lock:
+            if path in self._entries:
+                self._entries.move_to_end(path)
+            self.hits += 1
+        return True
+
+    def discard(self, path):
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def __contains__(self, path):
+        return self.contains(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self):
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "expirations": self.expirations}
+
+PROCESSED_FILES = ProcessedFiles()
 
 def load_config():
+    """Read config.json; nothing takes effect until apply_file_rules()/apply_config()."""
     with open(CONFIG_FILE, 'r') as f:
         return json.load(f)
 
+def apply_file_rules(config):
+    """Install the extension index and name filter a config describes."""
+    global FILE_TYPE_INDEX, NAME_FILTER
+    FILE_TYPE_INDEX = build_extension_index(config)
+    NAME_FILTER = NameFilter(config.get('partial_suffixes', DEFAULT_PARTIAL_SUFFIXES),
+                             config.get('lock_patterns', DEFAULT_LOCK_PATTERNS))
+    if config.get('duplicate_action', DEFAULT_DUPLICATE_ACTION) not in DUPLICATE_ACTIONS:
+        logging.warning(f"Unknown duplicate_action {config['duplicate_action']!r}; duplicates will be kept")
+
 def load_history():
-    if not os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, 'w') as f: json.dump([], f)
-    with open(HISTORY_FILE, 'r') as f:
-        return json.load(f)
+    """Stream history records, oldest first."""
+    return HISTORY.iter_records()
 
 def save_history(record):
-    history = load_history()
-    history.append(record)
-    with open(HISTORY_FILE, 'w') as f:
-        json.dump(history, f, indent=2)
-
-def get_file_type(filename, config):
-    file_ext = os.path.splitext(filename)[1].lower()
-    for f_type, extensions in config['file_types'].items():
-        if file_ext in extensions:
-            return f_type
-    return 'Others'
-
-def is_file_stable(filepath, wait_seconds=2):
+    HISTORY.append(record)
+
+ExtensionIndex = namedtuple('ExtensionIndex', ['types', 'max_parts', 'ambiguous'])
+
+def build_extension_index(config):
+    """Build a read-only {extension: category} index from config['file_types'].
+
+    Extensions are case-folded. When an extension is listed under more than
+    one category the first one wins, as it did with the old linear search,
+    and the extension is also listed in `ambiguous`. max_parts is the most
+    dots in any configured extension (2 for .tar.gz).
+    """
+    types = {}
+    ambiguous = set()
+    for f_type, extensions in config.get('file_types', {}).items():
+        for ext in extensions:
+            ext = ext.casefold()
+            if types.setdefault(ext, f_type) != f_type:
+                ambiguous.add(ext)
+    max_parts = max((ext.count('.') for ext in types), default=1)
+    return ExtensionIndex(MappingProxyType(types), max_parts, frozenset(ambiguous))
+
+FILE_TYPE_INDEX = ExtensionIndex(MappingProxyType({}), 1, frozenset())
+CONTENT_SNIFFER = ContentSniffer()
+
+def get_file_type(filename, index=None):
+    """Classify a file name with a hash lookup per candidate suffix.
+
+    Multi-part extensions are only tried when the config has any, and the
+    longest match wins, so '.tar.gz' beats '.gz' when both are configured.
+    """
+    if index is None:
+        index = FILE_TYPE_INDEX
+    name = filename.casefold()
+    dot = name.rfind('.', 1)  # a leading dot is a hidden file, not an extension
+    if dot == -1:
+        return 'Others'
+    f_type = index.types.get(name[dot:])
+    for _ in range(index.max_parts - 1):
+        dot = name.rfind('.', 1, dot)
+        if dot == -1:
+            break
+        f_type = index.types.get(name[dot:], f_type)
+    return f_type or 'Others'
+
+def classify_file(filepath, st=None, index=None, sniff=True):
+    """get_file_type(), falling back to the file's first bytes when the name
+    gives no category or an extension claimed by several categories.
+
+    The content check is one small read at most (see ContentSniffer) and
+    only counts if the sniffed extension is configured in some category.
+    """
+    if index is None:
+        index = FILE_TYPE_INDEX
+    filename = os.path.basename(filepath)
+    f_type = get_file_type(filename, index)
+    if not sniff or (f_type != 'Others' and os.path.splitext(filename)[1].casefold() not in index.ambiguous):
+        return f_type
+    ext = CONTENT_SNIFFER.sniff(filepath, st)
+    sniffed = index.types.get(ext) if ext else None
+    FILES_SNIFFED.inc(result='matched' if sniffed else 'unknown')
+    if sniffed and sniffed != f_type:
+        logging.info(f"Classified '{filename}' as {sniffed} by its content ({ext})")
+        return sniffed
+    return f_type
+
+class NameFilter:
+    """Names the organizer never moves: hidden files, downloads still in
+    progress (partial suffixes) and editors' lock files (glob patterns).
+
+    Suffixes become one case-folded tuple for str.endswith and the
+    patterns one compiled regex, so a check costs two C calls.
+    """
+
+    def __init__(self, partial_suffixes=DEFAULT_PARTIAL_SUFFIXES, lock_patterns=DEFAULT_LOCK_PATTERNS):
+        self.partial_suffixes = tuple(suffix.casefold() for suffix in partial_suffixes)
+        self._locks = re.compile('|'.join(fnmatch.translate(p.casefold()) for p in lock_patterns)) \
+            if lock_patterns else None
+
+    def is_partial(self, filename):
+        return filename.casefold().endswith(self.partial_suffixes)
+
+    def skip(self, filename):
+        if filename.startswith('.'):
+            return True
+        name = filename.casefold()
+        return name.endswith(self.partial_suffixes) or (self._locks is not None and
+                                                        self._locks.match(name) is not None)
+
+NAME_FILTER = NameFilter()
+
+def close_events_supported():
+    """True when the watch backend reports close-after-write (inotify IN_CLOSE_WRITE)."""
+    if not hasattr(watchdog.events, 'FileClosedEvent'):  # watchdog 2.3+
+        return False
+    return Observer.__name__ == 'InotifyObserver'
+
+CLOSE_EVENTS = close_events_supported()
+
+def is_file_stable(filepath, wait_seconds=STABILITY_INTERVAL, sleep=time.sleep):
+    """Blocking one-off check; the organizer itself uses StabilityScheduler."""
     try:
         initial_size = os.path.getsize(filepath)
-        time.sleep(wait_seconds)
+        sleep(wait_seconds)
         final_size = os.path.getsize(filepath)
         return initial_size == final_size and final_size > 0
     except (OSError, FileNotFoundError):
         return False
 
+class StabilityScheduler:
+    """Hold candidate files until they are complete.
+
+    A close-after-write notification (complete()) releases a file at once.
+    Otherwise it is polled: it goes once its size and mtime hold still
+    between two checks. Each time a check finds it not ready, the wait
+    before the next one doubles up to `max_interval`, so writers that pause
+    are given longer. An empty file is never ready; once it has stayed
+    empty for `max_interval` it is left in place, and a later write brings
+    it back as a new event. Observer callbacks only call submit(); one timer
+    thread wakes when the earliest entry is due and re-checks every due
+    file in a single batch, so a slow download never blocks events for
+    other files.
+    """
+
+    def __init__(self, executor, interval=STABILITY_INTERVAL, max_interval=DEFAULT_STABILITY_MAX_INTERVAL):
+        self.executor = executor
+        self.interval = interval
+        self.max_interval = max(max_interval, interval)
+        self._pending = {}  # path -> (size, mtime, job, first seen, current wait, due time)
+        self._heap = []     # (due time, path)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="StabilityScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+
+    def submit(self, filepath, job, st=None, trust_age=False, complete=False, patient=False):
+        """Start watching a file; job(filepath) runs on a worker once it is complete.
+
+        complete means the writer is known to be done (it closed the file),
+        so the job is dispatched now. With trust_age (used by the startup
+        scan) a file whose mtime and ctime are both older than the
+        stability window is dispatched straight away too. patient starts
+        with the longest wait, for files whose close event should come
+        first. Returns False if the file is gone or already pending.
+        """
+        if complete:
+            self.complete(filepath, job)
+            return True
+        try:
+            if st is None:
+                st = os.stat(filepath)
+        except OSError:
+            return False
+        if trust_age and st.st_size > 0 and time.time() - max(st.st_mtime, st.st_ctime) >= self.interval:
+            STABILITY_WAIT.observe(0)
+            self.executor.submit(job, filepath)
+            return True
+        wait = self.max_interval if patient else self.interval
+        with self._cond:
+            if filepath in self._pending:
+                return False  # already waiting on this file
+            due = time.monotonic() + wait
+            self._pending[filepath] = (st.st_size, st.st_mtime, job, time.monotonic(), wait, due)
+            heapq.heappush(self._heap, (due, filepath))
+            self._cond.notify()
+        return True
+
+    def complete(self, filepath, job=None):
+        """The writer closed the file: dispatch it now instead of polling.
+
+        Uses the pending entry's job, or `job` if the file was not pending.
+        Returns False if there was nothing to dispatch.
+        """
+        with self._cond:
+            entry = self._pending.pop(filepath, None)  # its heap entry is skipped when due
+        if entry is not None:
+            job = entry[2]
+            STABILITY_WAIT.observe(time.monotonic() - entry[3])
+        elif job is None:
+            return False
+        else:
+            STABILITY_WAIT.observe(0)
+        self.executor.submit(job, filepath)
+        return True
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if self._heap:
+                        delay = self._heap[0][0] - time.monotonic()
+                        if delay <= 0:
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    when, path = heapq.heappop(self._heap)
+                    entry = self._pending.get(path)
+                    if entry is not None and entry[5] == when:  # skip entries completed or re-queued since
+                        due.append(path)
+            self._check(due)
+
+    def _check(self, paths):
+        # stat outside the lock so submit() never waits on the disk
+        current = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+                current[path] = (st.st_size, st.st_mtime)
+            except OSError:
+                current[path] = None
+
+        ready = []
+        with self._cond:
+            for path, now_seen in current.items():
+                entry = self._pending.get(path)
+                if entry is None:
+                    continue
+                size, mtime, job, first_seen, wait, _ = entry
+                if now_seen is None:
+                    del self._pending[path]  # deleted or moved away meanwhile
+                elif now_seen == (size, mtime) and size > 0:
+                    del self._pending[path]
+                    STABILITY_WAIT.observe(time.monotonic() - first_seen)
+                    ready.append((path, job))
+                elif now_seen == (size, mtime) and time.monotonic() - first_seen >= self.max_interval:
+                    del self._pending[path]  # still empty: a placeholder, not a download
+                    logging.info(f"Leaving empty file {os.path.basename(path)} in place.")
+                else:
+                    wait = min(wait * 2, self.max_interval)  # still being written, or still empty: back off
+                    due = time.monotonic() + wait
+                    self._pending[path] = (now_seen[0], now_seen[1], job, first_seen, wait, due)
+                    heapq.heappush(self._heap, (due, path))
+                    logging.info(f"Waiting for {os.path.basename(path)} to be fully downloaded...",
+                                 extra={"rate_key": ("waiting", path)})
+
+        for path, job in ready:
+            logging.info(f"{os.path.basename(path)} is now stable.")
+            self.executor.submit(job, path)
+
+class MovePool:
+    """Shared thread pool for file moves across every monitored folder.
+
+    submit() blocks once `max_queued` jobs are waiting or running, so an
+    event flood applies backpressure instead of growing memory. Destination
+    names are reserved atomically by DESTINATION_NAMES, so moves into the
+    same category folder run in parallel too.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKER_THREADS, max_queued=DEFAULT_MAX_QUEUED_JOBS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Mover")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self._outstanding = 0
+        self._futures = set()  # queued or running, so shutdown() can cancel the queued ones
+        self._count_lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._count_lock:
+            self._outstanding += 1
+            self._futures.add(future)
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, future):
+        with self._count_lock:
+            self._outstanding -= 1
+            self._futures.discard(future)
+        self._slots.release()
+
+    def outstanding(self):
+        """Jobs queued or running."""
+        return self._outstanding
+
+    def shutdown(self, wait=True, cancel_queued=False):
+        """Stop the pool; with cancel_queued only the moves already running finish.
+
+        Cancelled files stay where they are and are picked up by the next
+        start's scan. (ThreadPoolExecutor's cancel_futures needs Python 3.9.)
+        """
+        if cancel_queued:
+            with self._count_lock:
+                futures = list(self._futures)
+            cancelled = sum(future.cancel() for future in futures)
+            if cancelled:
+                logging.info(f"Left {cancelled} queued move(s) for the next start.")
+        self._executor.shutdown(wait=wait)
+
+class EventCoalescer:
+    """Collapse bursts of filesystem events into one "file ready" per file.
+
+    Browsers and sync clients emit a create, many modifies and then a rename
+    from .crdownload to the final name for a single download. Every event
+    only refreshes the path's quiet timer; a rename carries the pending entry
+    over to the new name; a delete drops it. Once a path has been quiet for
+    `window` seconds, emit(path) is called once. events_in and events_out
+    show how much churn is absorbed.
+    """
+
+    def __init__(self, window=DEFAULT_COALESCE_WINDOW):
+        self.window = window
+        self._pending = {}  # path -> [last event time, emit callback]
+        self._heap = []     # (due time, path)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+        self.events_in = 0
+        self.events_out = 0
+        self.renames_followed = 0
+        self.dropped = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="EventCoalescer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+
+    def touch(self, path, emit):
+        """A created or modified event for path; the latest emit callback wins."""
+        now = time.monotonic()
+        with self._cond:
+            self.events_in += 1
+            entry = self._pending.get(path)
+            if entry is not None:
+                entry[0] = now
+                entry[1] = emit
+                return
+            self._pending[path] = [now, emit]
+            heapq.heappush(self._heap, (now + self.window, path))
+            self._cond.notify()
+
+    def moved(self, src_path, dest_path, emit):
+        """A rename: follow the chain so src's pending events land on dest."""
+        now = time.monotonic()
+        with self._cond:
+            self.events_in += 1
+            if self._pending.pop(src_path, None) is not None:
+                self.renames_followed += 1
+            entry = self._pending.get(dest_path)
+            if entry is not None:
+                entry[0] = now
+                return
+            self._pending[dest_path] = [now, emit]
+            heapq.heappush(self._heap, (now + self.window, dest_path))
+            self._cond.notify()
+
+    def completed(self, path, emit, src_path=None):
+        """The file is whole (its writer closed it): emit now, skipping the quiet window.
+
+        src_path is the old name when completion is signalled by a rename.
+        """
+        with self._cond:
+            self.events_in += 1
+            if src_path is not None and self._pending.pop(src_path, None) is not None:
+                self.renames_followed += 1
+            self._pending.pop(path, None)  # its heap entry is skipped when due
+            self.events_out += 1
+        emit(path)
+
+    def deleted(self, path):
+        with self._cond:
+            self.events_in += 1
+            if self._pending.pop(path, None) is not None:
+                self.dropped += 1
+
+    def stats(self):
+        with self._cond:
+            return {"events_in": self.events_in, "events_out": self.events_out,
+                    "renames_followed": self.renames_followed, "dropped": self.dropped,
+                    "pending": len(self._pending)}
+
+    def _run(self):
+        while True:
+            ready = []
+            with self._cond:
+                while not self._stopped and not self._heap:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                due, path = self._heap[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    _, path = heapq.heappop(self._heap)
+                    entry = self._pending.get(path)
+                    if entry is None:
+                        continue  # renamed away or deleted
+                    quiet_until = entry[0] + self.window
+                    if quiet_until > now:
+                        heapq.heappush(self._heap, (quiet_until, path))  # still busy
+                        continue
+                    del self._pending[path]
+                    self.events_out += 1
+                    ready.append((path, entry[1]))
+            for path, emit in ready:
+                emit(path)
+
+WORKERS = None
+SCHEDULER = None
+COALESCER = None
+TRANSFERS = None  # Journal of in-flight cross-device copies
+DESTINATION_NAMES = DestinationNames()
+DUPLICATES = DuplicateFinder()  # content index of destination folders, used unless duplicate_action is 'keep'
+MOVE_LISTENERS = []  # callables(source path, destination path, move stats) run after each move
+
+def start_workers(config):
+    """Create the shared mover pool, stability scheduler and event coalescer."""
+    global WORKERS, SCHEDULER, COALESCER, TRANSFERS
+    TRANSFERS = TransferJournal()
+    WORKERS = MovePool(config.get('worker_threads', DEFAULT_WORKER_THREADS),
+                       config.get('max_queued_jobs', DEFAULT_MAX_QUEUED_JOBS))
+    SCHEDULER = StabilityScheduler(WORKERS, config.get('stability_interval', STABILITY_INTERVAL),
+                                   config.get('stability_max_interval', DEFAULT_STABILITY_MAX_INTERVAL))
+    SCHEDULER.start()
+    COALESCER = EventCoalescer(config.get('coalesce_window', DEFAULT_COALESCE_WINDOW))
+    COALESCER.start()
+    logging.info(f"Started {WORKERS.max_workers} mover threads.")
+
+def stop_workers():
+    """Stop accepting new work, drop queued moves and wait for in-flight ones to finish."""
+    if COALESCER:
+        COALESCER.stop()
+        logging.info(f"Event coalescer stats: {COALESCER.stats()}")
+    if SCHEDULER:
+        SCHEDULER.stop()
+    if WORKERS:
+        WORKERS.shutdown(wait=True, cancel_queued=True)
+
 class DownloadHandler(FileSystemEventHandler):
-    def __init__(self, config, source_folder):
+    """Organize new files in monitored folders.
+
+    Built with a source_folder it serves just that folder. Without one it
+    routes: the same handler is scheduled for every watch on the shared
+    Observer and finds each event's folder in a prefix index of folder
+    paths. Sharing the Observer saves only the dispatch thread and handler
+    each folder used to have: watchdog still starts an emitter with its own
+    OS watch for every schedule() (on Linux an inotify instance plus a
+    reader thread, so two threads per folder; on Windows one thread and a
+    directory handle).
+    """
+
+    def __init__(self, config, source_folder=None):
         self.config = config
         self.source_folder = source_folder
+        self.folders = {}  # normcased folder path -> folder path as configured
+        self.excludes = {}  # normcased folder path -> ExcludeMatcher
+
+    def add_folder(self, folder_path, matcher=None):
+        key = os.path.normcase(os.path.normpath(folder_path))
+        self.folders[key] = folder_path
+        if matcher is not None:
+            self.excludes[key] = matcher
+
+    def remove_folder(self, folder_path):
+        key = os.path.normcase(os.path.normpath(folder_path))
+        self.folders.pop(key, None)
+        self.excludes.pop(key, None)
+
+    def _folder_key(self, filepath):
+        folder = os.path.dirname(os.path.normcase(os.path.normpath(filepath)))
+        while folder:
+            if folder in self.folders:
+                return folder
+            parent = os.path.dirname(folder)
+            if parent == folder:
+                break
+            folder = parent
+        return None
+
+    def resolve_folder(self, filepath):
+        """Return the monitored folder an event path belongs to, or None."""
+        if self.source_folder:
+            return self.source_folder
+        key = self._folder_key(filepath)
+        return self.folders[key] if key is not None else None
+
+    def excluded(self, filepath):
+        """True for paths in category folders or matching the ignore patterns."""
+        matcher = self.excludes.get(self._folder_key(filepath))
+        return matcher is not None and matcher.excluded(filepath)
+
+    def dispatch(self, event):
+        EVENTS_RECEIVED.inc()
+        # Judge a move by where the file ended up
+        if self.excludes and self.excluded(getattr(event, 'dest_path', '') or event.src_path):
+            return
+        super().dispatch(event)
 
     def on_created(self, event):
-        if not event.is_directory: self._process_file(event.src_path)
+        if not event.is_directory: COALESCER.touch(event.src_path, self._process_file)
+
+    def on_modified(self, event):
+        # With close events, a file being written will report its own completion
+        if not event.is_directory: COALESCER.touch(event.src_path, self._process_written
+                                                    if CLOSE_EVENTS else self._process_file)
+
+    def on_closed(self, event):
+        if not event.is_directory: COALESCER.completed(event.src_path, self._process_complete)
 
     def on_moved(self, event):
         if not event.is_directory:
-            PROCESSED_FILES.add(event.src_path)
-            self._process_file(event.dest_path)
+            if NAME_FILTER.is_partial(os.path.basename(event.src_path)):
+                # A finished download being renamed from .crdownload/.part to its real name
+                COALESCER.completed(event.dest_path, self._process_complete, event.src_path)
+            else:
+                COALESCER.moved(event.src_path, event.dest_path, self._process_file)
+
+    def on_deleted(self, event):
+        if not event.is_directory: COALESCER.deleted(event.src_path)
+
+    def _process_complete(self, filepath):
+        return self._process_file(filepath, complete=True)
+
+    def _process_written(self, filepath):
+        return self._process_file(filepath, patient=True)
+
+    def _process_file(self, filepath, st=None, trust_age=False, complete=False, patient=False):
+        """Filter an event and queue the file for the stability check.
 
-    def _process_file(self, filepath):
+        complete: the writer has closed the file, so skip the check.
+        patient: a close event is expected; poll only as a fallback.
+        Returns True if the file is now headed for a move, False if it is
+        left where it is.
+        """
+        filename = os.path.basename(filepath)
         try:
-            if filepath in PROCESSED_FILES: return
-            filename = os.path.basename(filepath)
-            if filename.startswith('.') or filename.endswith(('.tmp', '.crdownload')): return
-            if not os.path.exists(filepath): return
+            if NAME_FILTER.skip(filename): return False
+            source_folder = self.resolve_folder(filepath)
+            if source_folder is None: return False
+            if st is None:
+                try:
+                    st = os.stat(filepath)
+                except OSError:
+                    return False
+            if st.st_size == 0 and complete: return False  # e.g. a placeholder created then closed
+            if st.st_size == 0 and trust_age and time.time() - max(st.st_mtime, st.st_ctime) >= SCHEDULER.max_interval:
+                return False  # empty for a while, like an __init__.py: nothing to sort
+            if RESTORED_FILES.contains(filepath, st): return False  # put back by an undo
+            if PROCESSED_FILES.contains(filepath, st):
+                # Already waiting: a close event just means it can go now
+                return complete and SCHEDULER.complete(filepath)
             
-            logging.info(f"File event detected for: {filename}")
-            PROCESSED_FILES.add(filepath)
-
-            while not is_file_stable(filepath):
-                logging.info(f"Waiting for {filename} to be fully downloaded...")
-                time.sleep(2)
-            logging.info(f"{filename} is now stable.")
+            job = functools.partial(self._move_file, source_folder=source_folder,
+                                    queued_at=time.perf_counter())
+            if SCHEDULER.submit(filepath, job, st, trust_age, complete, patient):
+                logging.info(f"File event detected for: {filename}")
+            PROCESSED_FILES.add(filepath, st)
+            return True
+        except Exception as e:
+            logging.error(f"Error processing {filename}: {e}", exc_info=True)
+            return True  # not settled: look at it again on the next start
 
-            file_type = get_file_type(filename, self.config)
+    def _move_file(self, filepath, source_folder, queued_at=None):
+        """Move a stable file into its category folder (runs on a worker)."""
+        filename = os.path.basename(filepath)
+        timer = PROFILER.start(source_folder, queued_at)
+        try:
+            timer.mark('stability_wait')  # includes time queued for a free worker
+            file_type = classify_file(filepath, sniff=self.config.get('sniff_content', DEFAULT_SNIFF_CONTENT))
             type_folder_name = self.config['folder_paths'].get(file_type, 'Others')
-            destination_folder = os.path.join(self.source_folder, type_folder_name)
+            destination_folder = os.path.join(source_folder, type_folder_name)
+            timer.mark('classify')
             os.makedirs(destination_folder, exist_ok=True)
-            destination_path = os.path.join(destination_folder, filename)
+            timer.mark('makedirs')
 
-            counter = 1
-            base, ext = os.path.splitext(filename)
-            while os.path.exists(destination_path):
-                destination_path = os.path.join(destination_folder, f"{base}_{counter}{ext}")
-                counter += 1
-            
-            shutil.move(filepath, destination_path)
+            meta = {"file": filename, "type": file_type, "source_folder": source_folder}
+            origin = os.path.relpath(filepath, source_folder)
+            if origin != filename:
+                meta["from"] = origin  # came from a subfolder of a recursive watch; undo puts it back there
+            action = self.config.get('duplicate_action', DEFAULT_DUPLICATE_ACTION)
+            duplicate = None
+            if action in ('skip', 'hardlink'):
+                duplicate = DUPLICATES.find(destination_folder, filepath)
+                timer.mark('find_duplicate')
+            if duplicate is not None and action == 'skip':
+                os.unlink(filepath)
+                DUPLICATES_FOUND.inc(action=action)
+                logging.info(f"Removed '{filename}': identical to "
+                             f"'{os.path.relpath(duplicate, source_folder)}'")
+                record_move(meta, duplicate, duplicate=action)
+                for listener in MOVE_LISTENERS:
+                    listener(filepath, duplicate, {"bytes": 0, "seconds": 0.0, "method": 'duplicate'})
+                return
+
+            destination_path = DESTINATION_NAMES.allocate(destination_folder, filename)
+            timer.mark('allocate_name')
+            try:
+                stats = None
+                if duplicate is not None:
+                    stats = self._link_duplicate(filepath, duplicate, destination_path)
+                if stats is None:
+                    stats = move_file(filepath, destination_path, TRANSFERS, meta)
+            except Exception:
+                DESTINATION_NAMES.release(destination_path)
+                raise
+            timer.mark('move')
             PROCESSED_FILES.add(destination_path)
-            logging.info(f"Moved '{filename}' to '{os.path.relpath(destination_path, self.source_folder)}'")
-            
-            history_record = {
-                "file": filename, "type": file_type, "date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                "destination": os.path.relpath(destination_path, self.source_folder),
-                "source_folder": self.source_folder
-            }
-            save_history(history_record)
+            if action != 'keep':
+                DUPLICATES.add(destination_path, stats["bytes"])
+            FILES_MOVED.inc(category=file_type)
+            BYTES_MOVED.inc(stats["bytes"])
+            MOVE_DURATION.observe(stats["seconds"])
+            if stats["method"] == 'hardlink':
+                DUPLICATES_FOUND.inc(action='hardlink')
+                logging.info(f"Linked '{filename}' as '{os.path.relpath(destination_path, source_folder)}': "
+                             f"identical to '{os.path.relpath(duplicate, source_folder)}'")
+            else:
+                logging.info(f"Moved '{filename}' to '{os.path.relpath(destination_path, source_folder)}'")
+            record_move(meta, destination_path, duplicate=action if stats["method"] == 'hardlink' else None)
+            timer.mark('save_history')
+            for listener in MOVE_LISTENERS:
+                listener(filepath, destination_path, stats)
         except Exception as e:
             logging.error(f"Error processing {filename}: {e}", exc_info=True)
 
+    @staticmethod
+    def _link_duplicate(filepath, existing, destination_path):
+        """Store filepath as a hard link to its identical twin; None if links are unsupported."""
+        start = time.monotonic()
+        try:
+            link_duplicate(existing, destination_path)
+        except OSError as e:
+            logging.warning(f"Could not hard link '{destination_path}' to '{existing}', moving instead: {e}")
+            return None
+        os.unlink(filepath)
+        return {"bytes": os.path.getsize(existing), "seconds": time.monotonic() - start, "method": 'hardlink'}
+
+def record_move(meta, destination_path, duplicate=None):
+    """Write the history record for a finished move.
+
+    `duplicate` is the duplicate_action that handled an identical file:
+    'skip' means the source was deleted and destination is the copy that
+    was already there, 'hardlink' that destination is a link to it.
+    """
+    history_record = {
+        "file": meta["file"], "type": meta["type"], "date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "destination": os.path.relpath(destination_path, meta["source_folder"]),
+        "source_folder": meta["source_folder"]
+    }
+    if meta.get("from"):
+        history_record["from"] = meta["from"]
+    if duplicate:
+        history_record["duplicate"] = duplicate
+    save_history(history_record)
+    DAILY_MOVES.add(meta["source_folder"], history_record["date"][:10])
+
+class DailyCounts:
+    """Files organized per source folder today, for the control panel."""
+
+    def __init__(self):
+        self._day = None
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, folder, day, count=1):
+        with self._lock:
+            if day != self._day:
+                if self._day is not None and day < self._day:
+                    return
+                self._day, self._counts = day, {}
+            self._counts[folder] = self._counts.get(folder, 0) + count
+
+    def snapshot(self):
+        today = datetime.now().strftime('%Y-%m-%d')
+        with self._lock:
+            return dict(self._counts) if self._day == today else {}
+
+DAILY_MOVES = DailyCounts()
+
+def seed_daily_counts(before):
+    """Count today's moves already in the history, up to the `before` timestamp."""
+    today = before[:10]
+    try:
+        HISTORY_INDEX.refresh()
+        counts = HISTORY_INDEX.counts_by_folder(since=today, until=before)
+    except Exception as e:
+        logging.error(f"Could not read today's moves from the history index: {e}", exc_info=True)
+        counts = {}
+    for folder, count in counts.items():
+        DAILY_MOVES.add(folder, today, count)
+    if CHANNEL:
+        CHANNEL.publish('status', **status_snapshot())
+
+def load_restored_files():
+    """Read which files undo.py put back, then let the startup scans go ahead."""
+    try:
+        restored = RESTORED_FILES.load(HISTORY_INDEX)
+        if restored:
+            logging.info(f"Leaving {restored} file(s) put back by undo where they are.")
+    except Exception as e:
+        logging.error(f"Could not read undone moves from the history index: {e}", exc_info=True)
+    finally:
+        RESTORED_FILES_LOADED.set()
+
+def finish_interrupted_transfers(entries):
+    """Resume cross-device copies that a crash or shutdown cut short.
+
+    Their sources were marked processed before the startup scans, so a scan
+    cannot start a second copy of the same file. Sources the resume gave up
+    on (changed since the crash) are unmarked and organized afresh.
+    """
+    completed = resume_transfers(TRANSFERS)
+    for entry in completed:
+        PROCESSED_FILES.add(entry["dst"])
+        if entry.get("meta"):
+            logging.info(f"Moved '{entry['meta']['file']}' to "
+                         f"'{os.path.relpath(entry['dst'], entry['meta']['source_folder'])}' (resumed)")
+            record_move(entry["meta"], entry["dst"])
+    resumed = {entry["dst"] for entry in completed}
+    for entry in entries:
+        if entry["dst"] not in resumed:
+            PROCESSED_FILES.discard(entry["src"])
+            if ROUTER is not None and os.path.exists(entry["src"]):
+                ROUTER._process_file(entry["src"])
+
 def get_folder_path(folder_config):
     """Get the full path for a monitored folder."""
     if folder_config.get('use_home_path', False):
@@ -124,61 +971,334 @@ def get_folder_path(folder_config):
     else:
         return folder_config['path']
 
-def main_logic():
-    """Contains the main application logic."""
-    logging.info("--- Program Start ---")
-    
-    config = load_config()
-    logging.info("Configuration loaded.")
+def scan_existing_files(handler, folder_path, folder_name, recursive=False, matcher=None, index=None):
+    """Queue the files already sitting in a monitored folder.
 
-    # Process each monitored folder
+    Runs on its own thread after the folder's watch has started, so live
+    events are never held up by the backlog. DirEntry stat data comes from
+    the directory listing where the OS provides it. Excluded subtrees are
+    never entered, and with a ScanIndex folders unchanged since the last
+    scan are skipped.
+    """
+    logging.info(f"Scanning existing files in {folder_name}...")
+    fingerprint = json.dumps([recursive, matcher.fingerprint if matcher else None])
+    try:
+        offered, listed, skipped = scan_files(
+            folder_path, lambda path, st: handler._process_file(path, st, trust_age=True),
+            matcher, recursive, index, fingerprint)
+        logging.info(f"Finished scanning {folder_name}: {offered} new or changed files "
+                     f"({listed} folders listed, {skipped} unchanged folders skipped).")
+        return True
+    except Exception as e:
+        logging.error(f"Error scanning {folder_name}: {e}")
+        return False
+
+def watch_mode(folder_config):
+    return None if folder_config is None else bool(folder_config.get('recursive', False))
+
+def exclude_matcher(folder_path, folder_config, config):
+    """Excludes for one folder: its category folders plus the ignore patterns."""
+    categories = set(config.get('folder_paths', {}).values()) | {'Others'}
+    patterns = list(config.get('ignore_patterns', DEFAULT_IGNORE_PATTERNS))
+    patterns += folder_config.get('ignore_patterns', [])
+    return ExcludeMatcher(folder_path, categories, patterns)
+
+def watch_recursively(folder_path, folder_name, watch, max_dirs, dirs=None):
+    """Swap a folder's top-level watch for a recursive one if the tree is small enough.
+
+    Every folder under a recursive watch costs a kernel watch descriptor
+    (inotify on Linux), so trees over max_dirs stay top-level only. `dirs`
+    is the count from the last run, if known, to save walking the tree.
+    """
+    if dirs is None:
+        dirs = count_dirs(folder_path, max_dirs)
+    if dirs > max_dirs:
+        logging.warning(f"{folder_name} has more than {max_dirs} subfolders; watching its top level only. "
+                        f"Raise max_watch_dirs to watch all of it.")
+        return False
+    with WATCH_LOCK:
+        if WATCHES.get(folder_path) is not watch:
+            return False  # stopped or replaced meanwhile
+        # Schedule before unscheduling so no event falls in between
+        WATCHES[folder_path] = OBSERVER.schedule(ROUTER, folder_path, recursive=True)
+        OBSERVER.unschedule(watch)
+    logging.info(f"Watching {folder_name} recursively ({dirs} folders).")
+    return True
+
+def monitor_folder_tree(folder_path, folder_config, folder_name, watch, matcher, max_dirs):
+    """Scan thread body: widen the watch if recursive, then queue the backlog."""
+    index = ScanIndex(folder_path).load()
+    recursive = folder_config.get('recursive', False)
+    if recursive:
+        recursive = watch_recursively(folder_path, folder_name, watch, max_dirs, index.watch_dirs)
+    RESTORED_FILES_LOADED.wait()  # files put back by an undo must be known before the backlog is queued
+    if not scan_existing_files(ROUTER, folder_path, folder_name, recursive, matcher, index):
+        return
+    if folder_config.get('recursive', False):
+        # Refresh the folder count for the next start, after the backlog is queued
+        index.watch_dirs = count_dirs(folder_path, max_dirs)
+    try:
+        index.save()
+    except OSError as e:
+        logging.warning(f"Could not save scan index for {folder_name}: {e}")
+
+def enabled_folders(config):
+    """Map folder path -> folder config for every enabled, existing folder."""
+    folders = {}
     for folder_config in config.get('monitored_folders', []):
         if not folder_config.get('enabled', True):
             continue
-            
-        folder_path = get_folder_path(folder_config)
-        folder_name = folder_config.get('name', folder_path)
-        
+        folder_path = os.path.normpath(get_folder_path(folder_config))
         if not os.path.exists(folder_path):
             logging.warning(f"Monitored folder does not exist: {folder_path}")
             continue
-            
-        logging.info(f"Setting up monitoring for: {folder_name} ({folder_path})")
-        
-        # Scan existing files in this folder
-        logging.info(f"Scanning existing files in {folder_name}...")
-        temp_handler = DownloadHandler(config, folder_path)
+        folders[folder_path] = folder_config
+    return folders
+
+def start_monitoring(folder_path, folder_config):
+    """Add a watch for one folder, then scan its backlog in the background."""
+    folder_name = folder_config.get('name', folder_path)
+    logging.info(f"Setting up monitoring for: {folder_name} ({folder_path})")
+
+    # Start watching first so nothing that arrives during the scan is missed
+    matcher = exclude_matcher(folder_path, folder_config, ROUTER.config)
+    ROUTER.add_folder(folder_path, matcher)
+    with WATCH_LOCK:
+        watch = WATCHES[folder_path] = OBSERVER.schedule(ROUTER, folder_path, recursive=False)
+        WATCH_MODES[folder_path] = watch_mode(folder_config)
+    logging.info(f"--- Now monitoring: {folder_name} ({folder_path}) ---")
+
+    # Then work through the files that were already there, in the background
+    max_dirs = ROUTER.config.get('max_watch_dirs', DEFAULT_MAX_WATCH_DIRS)
+    threading.Thread(target=monitor_folder_tree,
+                     args=(folder_path, folder_config, folder_name, watch, matcher, max_dirs),
+                     name=f"Scan-{folder_name}", daemon=True).start()
+
+def stop_monitoring(folder_path):
+    """Remove one folder's watch. Files already queued from it still get moved."""
+    with WATCH_LOCK:
+        OBSERVER.unschedule(WATCHES.pop(folder_path))
+        WATCH_MODES.pop(folder_path, None)
+    ROUTER.remove_folder(folder_path)
+    logging.info(f"--- Stopped monitoring: {folder_path} ---")
+
+def apply_config(config):
+    """Bring the file rules and running watches in line with a freshly loaded config."""
+    apply_file_rules(config)
+    wanted = enabled_folders(config)
+    # A folder whose watch settings changed is restarted with the new ones
+    for folder_path in [p for p in WATCHES if watch_mode(wanted.get(p)) != WATCH_MODES.get(p)]:
+        stop_monitoring(folder_path)
+    ROUTER.config = config
+    for folder_path, folder_config in wanted.items():
+        if folder_path in WATCHES:
+            ROUTER.add_folder(folder_path, exclude_matcher(folder_path, folder_config, config))
+        else:
+            start_monitoring(folder_path, folder_config)
+    PROCESSED_FILES.resize(config.get('processed_files_max', DEFAULT_PROCESSED_MAX),
+                           config.get('processed_files_ttl', DEFAULT_PROCESSED_TTL))
+    PROFILER.enabled = PROFILE_ENV or config.get('profiling', False)
+    if CHANNEL:
+        CHANNEL.publish('status', **status_snapshot())
+
+# --- SUPERVISION ---
+# The PID file names our PID, start time and status channel port for the control panel
+SHUTDOWN = threading.Event()
+PID_LOCK = PidLock()
+CHANNEL = None
+
+def status_snapshot():
+    return {"pid": os.getpid(), "folders": sorted(WATCHES), "moved": FILES_MOVED.snapshot(),
+            "today": DAILY_MOVES.snapshot(), "queued": WORKERS.outstanding() if WORKERS else 0}
+
+def publish_move(source_path, destination_path, stats):
+    CHANNEL.publish('moved', file=os.path.basename(destination_path), destination=destination_path,
+                    source_folder=ROUTER.resolve_folder(source_path) if ROUTER else None,
+                    bytes=stats["bytes"])
+
+def request_shutdown():
+    logging.info("Shutdown requested by the control panel.")
+    SHUTDOWN.set()
+
+def request_profile(seconds=10):
+    """Write a stage report and sampled flamegraph; returns their paths."""
+    folded_path, report_path = dump_profile(PROFILER, seconds)
+    return {"flamegraph": folded_path, "stages": report_path}
+
+def profile_route(query):
+    try:
+        seconds = float(query.get('seconds', ['10'])[0])
+    except ValueError:
+        raise BadRequest("'seconds' must be a number") from None
+    if not seconds > 0:  # also rejects nan
+        raise BadRequest("'seconds' must be positive")
+    seconds = min(seconds, 300)
+    return 'application/json', json.dumps(request_profile(seconds)).encode('utf-8')
+
+def stages_route(query):
+    return 'text/plain; charset=utf-8', PROFILER.report().encode('utf-8')
+
+def history_route(query):
+    """Newest matching moves: ?type=&folder=&since=&until=&name=&before=&limit=
+
+    `next` in the reply is the `before` value for the following page.
+    """
+    def arg(name):
+        values = query.get(name)
+        return values[0] if values else None
+
+    def int_arg(name, default):
+        value = arg(name)
+        if not value:
+            return default
         try:
-            for filename in os.listdir(folder_path):
-                filepath = os.path.join(folder_path, filename)
-                if os.path.isfile(filepath):
-                    temp_handler._process_file(filepath)
-        except Exception as e:
-            logging.error(f"Error scanning {folder_name}: {e}")
-        
-        # Set up monitoring for this folder
-        event_handler = DownloadHandler(config, folder_path)
-        observer = Observer()
-        observer.schedule(event_handler, folder_path, recursive=False)
-        observer.start()
-        OBSERVERS.append(observer)
-        logging.info(f"--- Now monitoring: {folder_name} ({folder_path}) ---")
-
-    if not OBSERVERS:
+            return int(value)
+        except ValueError:
+            raise BadRequest(f"'{name}' must be an integer") from None
+
+    # Clamp here, not only in query(), so a short page really means the last one
+    limit = max(1, min(int_arg('limit', PAGE_SIZE), MAX_PAGE_SIZE))
+    before = int_arg('before', None)
+    HISTORY_INDEX.refresh()
+    records = HISTORY_INDEX.query(limit=limit, since=arg('since'), until=arg('until'), type=arg('type'),
+                                  source_folder=arg('folder'), name=arg('name'), before_id=before)
+    next_page = records[-1]["id"] if records and len(records) == limit else None
+    return 'application/json', json.dumps({"records": records, "next": next_page}).encode('utf-8')
+
+class ConfigWatcher(FileSystemEventHandler):
+    """Reload config.json shortly after it changes, without a restart.
+
+    Writes are debounced so a save that shows up as several events reloads
+    once. A half-written file fails to parse and is simply retried on the
+    next event. Worker pool settings still need a restart.
+
+    The control panel bumps config_version on every write, so an older
+    version is ignored and an unchanged one only reloads if the content
+    differs (e.g. after a hand edit).
+    """
+
+    def __init__(self, config_file, delay=CONFIG_RELOAD_DELAY, config=None):
+        self.config_file = os.path.normcase(os.path.abspath(config_file))
+        self.delay = delay
+        self.config = config
+        self._timer = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    def on_any_event(self, event):
+        if event.event_type not in ('created', 'modified', 'moved', 'closed'):
+            return  # our own reads show up as opened/closed_no_write
+        paths = [getattr(event, 'src_path', ''), getattr(event, 'dest_path', '')]
+        if any(p and os.path.normcase(os.path.abspath(p)) == self.config_file for p in paths):
+            with self._lock:
+                if self._timer:
+                    self._timer.cancel()
+                self._timer = threading.Timer(self.delay, self.reload)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def reload(self):
+        with self._reload_lock:
+            try:
+                config = load_config()
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable config change: {e}")
+                return
+            if self.config is not None:
+                version, applied = config.get(VERSION_KEY, 0), self.config.get(VERSION_KEY, 0)
+                if version < applied or (version == applied and config == self.config):
+                    return
+            try:
+                apply_config(config)
+                self.config = config
+                logging.info(f"Configuration v{config.get(VERSION_KEY, 0)} reloaded; "
+                             f"monitoring {len(WATCHES)} folders.")
+            except Exception as e:
+                logging.error(f"Error applying new configuration: {e}", exc_info=True)
+
+def main_logic():
+    """Contains the main application logic."""
+    global OBSERVER, ROUTER, CHANNEL
+    logging.info("--- Program Start ---")
+    
+    config = load_config()
+    setup_logging(LOG_FILE, config.get('log_format', 'text'),
+                  config.get('log_max_bytes', DEFAULT_MAX_BYTES),
+                  config.get('log_backup_count', DEFAULT_BACKUP_COUNT))
+    apply_file_rules(config)
+    logging.info("Configuration loaded.")
+    PROCESSED_FILES.resize(config.get('processed_files_max', DEFAULT_PROCESSED_MAX),
+                           config.get('processed_files_ttl', DEFAULT_PROCESSED_TTL))
+    PROFILER.enabled = PROFILE_ENV or config.get('profiling', False)
+
+    CHANNEL = StatusChannel(hello=status_snapshot,
+                            commands={'stats': status_snapshot, 'stop': request_shutdown})
+    try:
+        PID_LOCK.acquire(port=CHANNEL.port)
+    except AlreadyRunning as e:
+        logging.error(f"{e}; not starting a second copy.")
+        CHANNEL.close()
+        return
+    atexit.register(PID_LOCK.release)
+    CHANNEL.start()
+    MOVE_LISTENERS.append(publish_move)
+
+    threading.Thread(target=seed_daily_counts, args=(datetime.now().strftime('%Y-%m-%d %H:%M:%S'),),
+                     name="DailyCounts", daemon=True).start()
+    start_workers(config)
+    metrics_server = MetricsServer(METRICS, config.get('metrics_port', DEFAULT_METRICS_PORT),
+                                   config.get('metrics_snapshot_interval', DEFAULT_METRICS_SNAPSHOT_INTERVAL))
+    metrics_server.routes['/profile'] = profile_route
+    metrics_server.routes['/stages'] = stages_route
+    metrics_server.routes['/history'] = history_route
+    metrics_server.start()
+    if hasattr(signal, 'SIGUSR1'):
+        # kill -USR1 <pid> writes a profile without stopping the organizer
+        signal.signal(signal.SIGUSR1, lambda signum, frame: threading.Thread(
+            target=request_profile, name="Profiler", daemon=True).start())
+    signal.signal(signal.SIGTERM, lambda signum, frame: SHUTDOWN.set())
+
+    OBSERVER = Observer()
+    ROUTER = DownloadHandler(config)
+    OBSERVER.start()
+    # Catching the index up can take a while after an upgrade; watch meanwhile
+    threading.Thread(target=load_restored_files, name="RestoredFiles", daemon=True).start()
+
+    interrupted = TRANSFERS.entries()
+    if interrupted:
+        # The resume owns these sources: keep the startup scans and events off them
+        for entry in interrupted:
+            PROCESSED_FILES.add(entry["src"])
+        WORKERS.submit(finish_interrupted_transfers, interrupted)
+
+    # Process each monitored folder
+    for folder_path, folder_config in enabled_folders(config).items():
+        start_monitoring(folder_path, folder_config)
+
+    if not WATCHES:
         logging.error("No folders are being monitored! Check your configuration.")
+        OBSERVER.stop()
+        CHANNEL.close()
         return
 
+    # Pick up config.json edits from the control panel while running
+    OBSERVER.schedule(ConfigWatcher(CONFIG_FILE, config=config), os.path.dirname(os.path.abspath(CONFIG_FILE)),
+                      recursive=False)
+
     try:
-        while True:
-            time.sleep(3600) # Sleep for a long time
+        while not SHUTDOWN.wait(1):  # the timeout keeps Ctrl+C working on Windows
+            pass
     except KeyboardInterrupt:
-        logging.info("Stopping all observers...")
-        for observer in OBSERVERS:
-            observer.stop()
-        logging.info("All observers stopped by user.")
-    
-    for observer in OBSERVERS:
-        observer.join()
+        logging.info("Stopped by user.")
+
+    logging.info("Stopping the observer...")
+    OBSERVER.stop()
+    OBSERVER.join()
+    stop_workers()
+    metrics_server.stop()
+    CHANNEL.close()
+    PID_LOCK.release()
+    logging.info(f"Processed-file cache stats: {PROCESSED_FILES.stats()}")
 
 if __name__ == "__main__":
     # This top-level try-except will catch ANY crash during startup and log it.
@@ -0,0 +1,228 @@
+"""
+Metrics for Silent Organizer
+In-process counters and histograms, served as Prometheus text on localhost
+"""
+
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_SNAPSHOT_FILE = os.path.join(os.path.expanduser('~'), 'FileOrganizer_metrics.json')
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+class BadRequest(ValueError):
+    """Raised by a route for an invalid query; answered with HTTP 400."""
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(labelnames, values))
+    return '{' + pairs + '}'
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        for key, value in items:
+            lines.append(f"{self.name}{_label_text(self.labelnames, key)} {value}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            if not self.labelnames:
+                return self._values.get((), 0)
+            return {','.join(key): value for key, value in self._values.items()}
+
+class Gauge:
+    """A value read from a callback each time metrics are collected."""
+
+    def __init__(self, name, help_text, func):
+        self.name = name
+        self.help = help_text
+        self.func = func
+
+    def _read(self):
+        try:
+            return self.func()
+        except Exception:
+            return 0
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name} {self._read()}"]
+
+    def snapshot(self):
+        return self._read()
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {count}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            return {"count": self._count, "sum": round(self._sum, 6),
+                    "buckets": dict(zip([str(b) for b in self.buckets] + ['+Inf'], self._counts))}
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, func):
+        return self._add(Gauge(name, help_text, func))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, buckets))
+
+    def render(self):
+        """Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        data = {"time": time.strftime('%Y-%m-%d %H:%M:%S')}
+        for metric in metrics:
+            data[metric.name] = metric.snapshot()
+        return data
+
+def write_snapshot(registry, path=METRICS_SNAPSHOT_FILE):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(registry.snapshot(), f, indent=2)
+    os.replace(tmp_path, path)
+
+class MetricsServer:
+    """Serve /metrics (Prometheus text) and /metrics.json on 127.0.0.1 only,
+    and write a snapshot file every `snapshot_interval` seconds.
+    """
+
+    def __init__(self, registry, port, snapshot_interval=60, snapshot_file=METRICS_SNAPSHOT_FILE):
+        self.registry = registry
+        self.port = port
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_file = snapshot_file
+        self.routes = {}  # extra GET path -> callable(query dict) returning (content type, body bytes);
+                          # it may raise BadRequest
+        self._httpd = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self.port:
+            server = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    url = urlsplit(self.path)
+                    path = url.path
+                    if path == '/metrics':
+                        body = server.registry.render().encode('utf-8')
+                        content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                    elif path == '/metrics.json':
+                        body = json.dumps(server.registry.snapshot(), indent=2).encode('utf-8')
+                        content_type = 'application/json'
+                    elif path in server.routes:
+                        try:
+                            content_type, body = server.routes[path](parse_qs(url.query))
+                        except BadRequest as e:
+                            self.send_error(400, str(e))
+                            return
+                    else:
+                        self.send_error(404)
+                        return
+                    self.send_response(200)
+                    self.send_header('Content-Type', content_type)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass  # keep scrapes out of FileOrganizer.log
+
+            try:
+                self._httpd = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+            except OSError as e:
+                logging.warning(f"Metrics endpoint disabled, could not bind port {self.port}: {e}")
+            else:
+                self._httpd.daemon_threads = True
+                threading.Thread(target=self._httpd.serve_forever, name="MetricsHTTP", daemon=True).start()
+                logging.info(f"Metrics available at http://127.0.0.1:{self.port}/metrics")
+        if self.snapshot_interval:
+            threading.Thread(target=self._snapshot_loop, name="MetricsSnapshot", daemon=True).start()
+
+    def _snapshot_loop(self):
+        while not self._stop.wait(self.snapshot_interval):
+            try:
+                write_snapshot(self.registry, self.snapshot_file)
+            except OSError as e:
+                logging.warning(f"Could not write metrics snapshot: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        if self.snapshot_interval:
+            try:
+                write_snapshot(self.registry, self.snapshot_file)
+            except OSError:
+                pass
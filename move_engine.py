@@ -0,0 +1,287 @@
+"""
+Move engine for Silent Organizer
+Same-device renames, zero-copy cross-device copies and resumable transfers
+"""
+
+import os
+import sys
+import json
+import time
+import errno
+import shutil
+import logging
+import threading
+
+TRANSFER_JOURNAL = os.path.join(os.path.expanduser('~'), 'FileOrganizer_transfers.json')
+PARTIAL_SUFFIX = '.organizer-partial'
+CHUNK_SIZE = 8 * 1024 * 1024
+CHECKPOINT_BYTES = 64 * 1024 * 1024  # fsync and record progress this often
+
+class TransferJournal:
+    """In-flight cross-device copies, persisted so a restart can resume them.
+
+    Only transfers that are currently running are stored, so the file stays
+    tiny and is rewritten atomically (temp file + os.replace) on each change.
+    """
+
+    def __init__(self, path=TRANSFER_JOURNAL):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def begin(self, src, dst, st, meta=None):
+        with self._lock:
+            self._entries[dst] = {"src": src, "dst": dst, "size": st.st_size,
+                                  "mtime_ns": st.st_mtime_ns, "copied": 0, "meta": meta}
+            self._save()
+
+    def checkpoint(self, dst, copied):
+        with self._lock:
+            if dst in self._entries:
+                self._entries[dst]["copied"] = copied
+                self._save()
+
+    def end(self, dst):
+        with self._lock:
+            if self._entries.pop(dst, None) is not None:
+                self._save()
+
+    def entries(self):
+        with self._lock:
+            return [dict(entry) for entry in self._entries.values()]
+
+def same_device(src, dst_folder):
+    try:
+        return os.stat(src).st_dev == os.stat(dst_folder).st_dev
+    except OSError:
+        return False
+
+def _copy_chunk(in_fd, out_fd, offset, count):
+    """Copy up to count bytes at offset, zero-copy where the OS allows it."""
+    if hasattr(os, 'copy_file_range'):
+        try:
+            return os.copy_file_range(in_fd, out_fd, count, offset, offset), 'copy_file_range'
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    if sys.platform.startswith('linux') and hasattr(os, 'sendfile'):
+        try:
+            os.lseek(out_fd, offset, os.SEEK_SET)
+            return os.sendfile(out_fd, in_fd, offset, count), 'sendfile'
+        except OSError as e:
+            if e.errno not in (errno.ENOSYS, errno.EINVAL):
+                raise
+    os.lseek(in_fd, offset, os.SEEK_SET)
+    os.lseek(out_fd, offset, os.SEEK_SET)
+    data = os.read(in_fd, count)
+    return os.write(out_fd, data), 'read/write'
+
+def _copy_from(src, tmp_path, dst, size, offset, journal):
+    """Copy src into tmp_path starting at offset; returns the copy method used."""
+    method = None
+    in_fd = os.open(src, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        out_fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            os.ftruncate(out_fd, offset)  # drop anything past the last checkpoint
+            next_checkpoint = offset + CHECKPOINT_BYTES
+            while offset < size:
+                copied, method = _copy_chunk(in_fd, out_fd, offset, min(CHUNK_SIZE, size - offset))
+                if copied == 0:
+                    raise OSError(errno.EIO, f"Source ended early at byte {offset}", src)
+                offset += copied
+                if journal and offset >= next_checkpoint:
+                    os.fsync(out_fd)
+                    journal.checkpoint(dst, offset)
+                    next_checkpoint = offset + CHECKPOINT_BYTES
+            os.fsync(out_fd)
+        finally:
+            os.close(out_fd)
+    finally:
+        os.close(in_fd)
+    return method or 'empty'
+
+def _finish(src, tmp_path, dst, journal):
+    shutil.copystat(src, tmp_path)
+    os.replace(tmp_path, dst)
+    os.unlink(src)
+    if journal:
+        journal.end(dst)
+
+def move_file(src, dst, journal=None, meta=None):
+    """Move src to dst and return {'bytes', 'seconds', 'method'}.
+
+    On the same device this is a single rename. Across devices the data is
+    copied into a temporary name next to dst and renamed into place, so dst
+    never holds a partial file; with a journal the copy can be resumed by
+    resume_transfers() after a crash.
+    """
+    start = time.monotonic()
+    dst_folder = os.path.dirname(dst)
+    if same_device(src, dst_folder):
+        try:
+            size = os.path.getsize(src)
+            os.replace(src, dst)
+            return {"bytes": size, "seconds": time.monotonic() - start, "method": 'rename'}
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+
+    st = os.stat(src)
+    tmp_path = dst + PARTIAL_SUFFIX
+    if journal:
+        journal.begin(src, dst, st, meta)
+    try:
+        method = _copy_from(src, tmp_path, dst, st.st_size, 0, journal)
+        _finish(src, tmp_path, dst, journal)
+    except Exception:
+        # A real error, not an interruption: nothing worth resuming
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        if journal:
+            journal.end(dst)
+        raise
+    stats = {"bytes": st.st_size, "seconds": time.monotonic() - start, "method": method}
+    log_transfer(dst, stats)
+    return stats
+
+def log_transfer(dst, stats):
+    seconds = max(stats["seconds"], 1e-9)
+    mib = stats["bytes"] / (1024 * 1024)
+    logging.info(f"Transferred '{os.path.basename(dst)}' ({mib:.1f} MiB) in {stats['seconds']:.2f}s "
+                 f"({mib / seconds:.1f} MiB/s) via {stats['method']}")
+
+def drop_placeholder(path):
+    """Remove the empty file DestinationNames.allocate() reserved at path, if nothing filled it."""
+    try:
+        if os.path.getsize(path) == 0:
+            os.unlink(path)
+    except OSError:
+        pass
+
+def resume_transfers(journal):
+    """Finish or clean up copies interrupted by a crash or shutdown.
+
+    A copy that cannot be finished takes its partial file and the empty
+    placeholder reserving its destination name with it, so a crash leaves
+    no zero-byte file under the real name. Returns the journal entries
+    (with their 'meta') that were completed.
+    """
+    completed = []
+    for entry in journal.entries():
+        src, dst = entry["src"], entry["dst"]
+        tmp_path = dst + PARTIAL_SUFFIX
+        try:
+            st = os.stat(src)
+        except OSError:
+            st = None
+        try:
+            if st is None or st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]:
+                # Source is gone or changed: the partial copy is worthless
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                drop_placeholder(dst)
+                journal.end(dst)
+                continue
+            start = time.monotonic()
+            have = os.path.getsize(tmp_path) if os.path.exists(tmp_path) else 0
+            offset = min(entry.get("copied", 0), have)
+            logging.info(f"Resuming transfer of '{os.path.basename(src)}' at byte {offset}")
+            method = _copy_from(src, tmp_path, dst, st.st_size, offset, journal)
+            _finish(src, tmp_path, dst, journal)
+            log_transfer(dst, {"bytes": st.st_size - offset, "seconds": time.monotonic() - start,
+                               "method": method})
+            completed.append(entry)
+        except Exception as e:
+            logging.error(f"Could not resume transfer of {src}: {e}", exc_info=True)
+    return completed
+
+class DestinationNames:
+    """Hand out free destination names without probing name_1, name_2, ...
+
+    Each destination folder gets an index of base name -> next free _N
+    counter, seeded once with scandir and advanced by our own allocations.
+    A name is claimed by creating an empty placeholder with O_EXCL, which
+    the move then replaces, so concurrent workers and outside writers can
+    never be handed the same name.
+    """
+
+    def __init__(self):
+        self._folders = {}  # normcased folder -> {(base, ext): next counter}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    @staticmethod
+    def _key(base, ext):
+        return (base.casefold(), ext.casefold())
+
+    def _seed(self, folder):
+        index = {}
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    base, ext = os.path.splitext(entry.name)
+                    stem, sep, number = base.rpartition('_')
+                    if sep and stem and number.isdigit():
+                        key = self._key(stem, ext)
+                        index[key] = max(index.get(key, 1), int(number) + 1)
+        except OSError:
+            pass
+        return index
+
+    def _folder(self, folder):
+        folder_key = os.path.normcase(os.path.abspath(folder))
+        with self._guard:
+            lock = self._locks.get(folder_key)
+            if lock is None:
+                lock = self._locks[folder_key] = threading.Lock()
+        return folder_key, lock
+
+    @staticmethod
+    def _claim(path):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        return True
+
+    def allocate(self, folder, filename):
+        """Reserve and return a free path for filename inside folder."""
+        path = os.path.join(folder, filename)
+        if self._claim(path):
+            return path  # the plain name is free: one syscall, no index needed
+
+        base, ext = os.path.splitext(filename)
+        key = self._key(base, ext)
+        folder_key, lock = self._folder(folder)
+        with lock:
+            index = self._folders.get(folder_key)
+            if index is None:
+                index = self._folders[folder_key] = self._seed(folder)
+            counter = index.get(key, 1)
+            while True:
+                path = os.path.join(folder, f"{base}_{counter}{ext}")
+                counter += 1
+                if self._claim(path):
+                    index[key] = counter
+                    return path
+
+    @staticmethod
+    def release(path):
+        """Drop a placeholder whose move failed."""
+        drop_placeholder(path)
@@ -0,0 +1,129 @@
+"""
+Profiling hooks for Silent Organizer
+Opt-in per-stage timings and on-demand sampling profiles of the running daemon
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+
+PROFILE_DIR = os.path.expanduser('~')
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+class _NullTimer:
+    """Returned when profiling is off so instrumented code pays one no-op call."""
+
+    def mark(self, stage):
+        pass
+
+NULL_TIMER = _NullTimer()
+
+class StageTimer:
+    __slots__ = ('profiler', 'folder', 'last')
+
+    def __init__(self, profiler, folder, start=None):
+        self.profiler = profiler
+        self.folder = folder
+        self.last = time.perf_counter() if start is None else start
+
+    def mark(self, stage):
+        """Record the time since the previous mark as `stage`."""
+        now = time.perf_counter()
+        self.profiler.record(self.folder, stage, now - self.last)
+        self.last = now
+
+class StageProfiler:
+    """Aggregate count / total / max time per (folder, stage)."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._stats = {}  # (folder, stage) -> [count, total, max]
+        self._lock = threading.Lock()
+
+    def start(self, folder, start=None):
+        if not self.enabled:
+            return NULL_TIMER
+        return StageTimer(self, folder, start)
+
+    def record(self, folder, stage, seconds):
+        key = (folder, stage)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                self._stats[key] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                if seconds > entry[2]:
+                    entry[2] = seconds
+
+    def report(self):
+        """Plain-text table, per folder then overall, slowest stages first."""
+        with self._lock:
+            stats = {key: list(value) for key, value in self._stats.items()}
+        if not stats:
+            return "No stage timings recorded (is profiling enabled?)\n"
+
+        overall = {}
+        for (folder, stage), (count, total, longest) in stats.items():
+            entry = overall.setdefault(stage, [0, 0.0, 0.0])
+            entry[0] += count
+            entry[1] += total
+            entry[2] = max(entry[2], longest)
+
+        lines = []
+        groups = [("All folders", overall)]
+        for folder in sorted({folder for folder, _ in stats}):
+            groups.append((folder, {stage: value for (f, stage), value in stats.items() if f == folder}))
+        for title, stages in groups:
+            lines.append(title)
+            lines.append(f"  {'stage':16} {'count':>8} {'total s':>10} {'mean ms':>10} {'max ms':>10}")
+            for stage, (count, total, longest) in sorted(stages.items(), key=lambda item: -item[1][1]):
+                lines.append(f"  {stage:16} {count:>8} {total:>10.3f} {total / count * 1000:>10.2f} "
+                             f"{longest * 1000:>10.2f}")
+            lines.append("")
+        return '\n'.join(lines)
+
+def sample_stacks(seconds, interval=SAMPLE_INTERVAL):
+    """Sample every thread's stack; returns a Counter of folded stacks."""
+    me = threading.get_ident()
+    names = {}
+    folded = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread in threading.enumerate():
+            names[thread.ident] = thread.name
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            folded[';'.join(reversed(stack))] += 1
+        time.sleep(interval)
+    return folded
+
+def dump_profile(profiler, seconds=10, directory=PROFILE_DIR):
+    """Write the stage report and a sampled flamegraph of the running process.
+
+    The .folded file is in the collapsed-stack format read by flamegraph.pl
+    and speedscope.app. Returns the two paths.
+    """
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    folded_path = os.path.join(directory, f"FileOrganizer_profile_{stamp}.folded")
+    report_path = os.path.join(directory, f"FileOrganizer_stages_{stamp}.txt")
+
+    folded = sample_stacks(seconds)
+    with open(folded_path, 'w', encoding='utf-8') as f:
+        for stack, count in folded.most_common():
+            f.write(f"{stack} {count}\n")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write(profiler.report())
+    logging.info(f"Profile written to {folded_path} and {report_path}")
+    return folded_path, report_path
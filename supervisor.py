@@ -0,0 +1,204 @@
+"""
+Process supervision for Silent Organizer
+PID-file lock and a local status channel between the organizer and the control panel
+"""
+
+import os
+import json
+import queue
+import socket
+import logging
+import threading
+import psutil
+
+PID_FILE = os.path.join(os.path.expanduser('~'), 'FileOrganizer.pid')
+START_TIME_TOLERANCE = 1.0  # seconds; create_time() is not bit-exact on every platform
+
+class AlreadyRunning(Exception):
+    pass
+
+def _start_time(pid):
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.NoSuchProcess, psutil.AccessDenied, TypeError, ValueError):
+        return None
+
+def read_pid_file(path=PID_FILE):
+    """Return the lock owner's info, or None if the file is missing or stale.
+
+    A PID alone is not enough: after a crash the OS can hand the same PID
+    to an unrelated process, so the recorded start time must match too.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    started = _start_time(info.get('pid'))
+    if started is None or abs(started - info.get('started', 0)) > START_TIME_TOLERANCE:
+        return None
+    return info
+
+class PidLock:
+    """Single-instance lock: an O_EXCL PID file naming our PID and start time."""
+
+    def __init__(self, path=PID_FILE):
+        self.path = path
+        self.info = None
+
+    def acquire(self, **extra):
+        info = {"pid": os.getpid(), "started": psutil.Process().create_time()}
+        info.update(extra)
+        for _ in range(3):
+            try:
+                fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                owner = read_pid_file(self.path)
+                if owner is not None:
+                    raise AlreadyRunning(f"Organizer is already running (PID {owner['pid']})")
+                try:
+                    os.unlink(self.path)  # left behind by a crashed organizer
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(info, f)
+            self.info = info
+            return info
+        raise AlreadyRunning(f"Could not take the organizer lock {self.path}")
+
+    def release(self):
+        if self.info is None:
+            return
+        owner = read_pid_file(self.path)
+        if owner is not None and owner.get('pid') == self.info['pid']:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        self.info = None
+
+class StatusChannel:
+    """Push organizer events to connected control panels as JSON lines.
+
+    Listens on an ephemeral 127.0.0.1 port that is published in the PID
+    file. Clients block on the socket and see the organizer exit as EOF, so
+    they need no polling. A client may send a command name per line; each
+    handler in `commands` returns a dict to send back, or None.
+    """
+
+    def __init__(self, hello=None, commands=None):
+        self.hello = hello
+        self.commands = commands or {}
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()  # (socket or None for everyone, encoded line)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen(8)
+        self.port = self._sock.getsockname()[1]
+        self._sender = None
+
+    @staticmethod
+    def _encode(event, data):
+        message = {"event": event}
+        message.update(data)
+        return (json.dumps(message) + '\n').encode('utf-8')
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, name="StatusAccept", daemon=True).start()
+        self._sender = threading.Thread(target=self._send_loop, name="StatusSend", daemon=True)
+        self._sender.start()
+
+    def publish(self, event, **data):
+        """Queue an event for every client; never blocks the caller."""
+        with self._lock:
+            if not self._clients:
+                return
+        self._queue.put((None, self._encode(event, data)))
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return  # closed
+            with self._lock:
+                self._clients.add(conn)
+            if self.hello:
+                self._queue.put((conn, self._encode('hello', self.hello())))
+            threading.Thread(target=self._read_loop, args=(conn,), name="StatusClient", daemon=True).start()
+
+    def _read_loop(self, conn):
+        try:
+            for line in conn.makefile('rb'):
+                command = line.strip().decode('utf-8', 'replace')
+                handler = self.commands.get(command)
+                if handler is None:
+                    continue
+                try:
+                    result = handler()
+                except Exception as e:
+                    logging.error(f"Status command '{command}' failed: {e}", exc_info=True)
+                    continue
+                if result is not None:
+                    self._queue.put((conn, self._encode(command, result)))
+        except OSError:
+            pass
+        self._drop(conn)
+
+    def _send_loop(self):
+        while True:
+            target, line = self._queue.get()
+            if line is None:
+                return
+            with self._lock:
+                clients = [target] if target is not None else list(self._clients)
+            for conn in clients:
+                try:
+                    conn.sendall(line)
+                except OSError:
+                    self._drop(conn)
+
+    def _drop(self, conn):
+        with self._lock:
+            self._clients.discard(conn)
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+    def close(self):
+        """Tell clients we are stopping, then close every connection."""
+        self.publish('stopping')
+        self._queue.put((None, None))
+        if self._sender is not None:
+            self._sender.join(timeout=5)
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        with self._lock:
+            clients = list(self._clients)
+        for conn in clients:
+            self._drop(conn)
+
+def connect(info, timeout=5):
+    """Open the status channel of the organizer described by `info`."""
+    sock = socket.create_connection(('127.0.0.1', info['port']), timeout=timeout)
+    sock.settimeout(None)
+    return sock
+
+def iter_messages(sock):
+    """Yield decoded messages until the organizer closes the channel."""
+    try:
+        for line in sock.makefile('rb'):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+    except OSError:
+        return
+
+def send_command(sock, command):
+    sock.sendall(command.encode('utf-8') + b'\n')
@@ -0,0 +1,204 @@
+"""
+Tree scanning for Silent Organizer
+Exclusion matching and pruned walks for recursively monitored folders
+"""
+
+import os
+import re
+import json
+import hashlib
+import fnmatch
+import logging
+
+DEFAULT_IGNORE_PATTERNS = ('.*', 'node_modules', '__pycache__')
+DEFAULT_MAX_WATCH_DIRS = 8192  # the traditional inotify max_user_watches
+SCAN_INDEX_DIR = os.path.join(os.path.expanduser('~'), 'FileOrganizer_scan_index')
+SCAN_INDEX_VERSION = 1
+
+def _compile(patterns):
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(p) for p in patterns))
+
+class ExcludeMatcher:
+    """Decide which paths under a monitored root the organizer leaves alone.
+
+    `prefixes` are root-relative subtrees excluded outright, such as the
+    category folders files are moved into. `patterns` are globs: one
+    without a slash ('node_modules', '*.iso') matches any single path
+    component, one with a slash ('build/*') matches the root-relative path.
+    Everything is compiled once: prefixes into a set, globs into one regex
+    per kind.
+    """
+
+    def __init__(self, root, prefixes=(), patterns=()):
+        self.root = os.path.normcase(os.path.normpath(root))
+        self.prefixes = {os.path.normcase(os.path.normpath(p)) for p in prefixes}
+        self.fingerprint = json.dumps([sorted(self.prefixes), sorted(patterns)])
+        name_patterns, path_patterns = [], []
+        for pattern in patterns:
+            pattern = pattern.replace('\\', '/').strip('/')
+            if pattern:
+                (path_patterns if '/' in pattern else name_patterns).append(os.path.normcase(pattern))
+        self._name = _compile(name_patterns)
+        # Path globs are matched against '/'-separated paths on every platform
+        self._path = _compile([p.replace(os.sep, '/') for p in path_patterns])
+
+    def _relative(self, path):
+        path = os.path.normcase(os.path.normpath(path))
+        if not path.startswith(self.root) or path[len(self.root):len(self.root) + 1] != os.sep:
+            return None
+        return path[len(self.root) + 1:]
+
+    def _matches(self, rel, name):
+        return (rel in self.prefixes
+                or (self._name is not None and self._name.match(name) is not None)
+                or (self._path is not None and self._path.match(rel.replace(os.sep, '/')) is not None))
+
+    def excluded(self, path):
+        """True if path, or any folder between it and the root, is excluded."""
+        rel = self._relative(path)
+        if rel is None:
+            return False
+        parts = rel.split(os.sep)
+        for depth in range(1, len(parts) + 1):
+            if self._matches(os.sep.join(parts[:depth]), parts[depth - 1]):
+                return True
+        return False
+
+    def excluded_child(self, path):
+        """Like excluded(), for a path whose parent is known not to be excluded."""
+        rel = self._relative(path)
+        if rel is None:
+            return False
+        return self._matches(rel, rel.rpartition(os.sep)[2])
+
+class ScanIndex:
+    """What a monitored tree looked like at the end of its last scan.
+
+    Per directory it keeps the directory's mtime when it was listed, its
+    subfolders, and (inode, size, mtime_ns) of the files the organizer left
+    in place. On the next start a directory with an unchanged mtime is not
+    listed at all, and in a changed one only new or changed files are
+    looked at. A directory where files were queued for a move is stored
+    without an mtime, so a restart lists it again and retries any move
+    that did not finish. One small JSON file per monitored folder.
+    """
+
+    def __init__(self, root, directory=SCAN_INDEX_DIR):
+        self.root = root
+        key = hashlib.sha1(os.path.normcase(os.path.abspath(root)).encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(directory, key + '.json')
+        self.fingerprint = None
+        self.watch_dirs = None  # folder count a recursive watch needed last time
+        self.dirs = {}  # root-relative folder -> {"mtime_ns", "subdirs", "files"}
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if data.get("version") == SCAN_INDEX_VERSION and data.get("root") == self.root:
+            self.fingerprint = data.get("fingerprint")
+            self.watch_dirs = data.get("watch_dirs")
+            self.dirs = data.get("dirs", {})
+        return self
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {"version": SCAN_INDEX_VERSION, "root": self.root, "fingerprint": self.fingerprint,
+                "watch_dirs": self.watch_dirs, "dirs": self.dirs}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+def scan_files(root, process, matcher=None, recursive=True, index=None, fingerprint=None):
+    """Offer each new or changed file under root to process(path, stat_result).
+
+    process returns True if it took the file (queued a move) and False if
+    it left it in place. Excluded subtrees are never entered. With an
+    index, unchanged directories are skipped and the index is updated for
+    the next start; it is only trusted if it was built with the same
+    fingerprint (exclusions and recursion). Depth-first with an explicit
+    stack, so only one directory handle is open at a time.
+
+    Returns (files offered, directories listed, directories skipped).
+    """
+    old = {}
+    if index is not None and index.fingerprint == fingerprint:
+        old = index.dirs
+    new = {}
+    offered = listed = skipped = 0
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        rel = os.path.relpath(folder, root)
+        try:
+            mtime_ns = os.stat(folder).st_mtime_ns
+        except OSError:
+            continue
+        previous = old.get(rel)
+        if previous is not None and previous["mtime_ns"] == mtime_ns:
+            new[rel] = previous
+            stack.extend(os.path.join(folder, name) for name in previous["subdirs"])
+            skipped += 1
+            continue
+
+        known = previous["files"] if previous is not None else {}
+        subdirs, files, settled = [], {}, True
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if matcher is not None and matcher.excluded_child(entry.path):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                subdirs.append(entry.name)
+                                stack.append(entry.path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                        st = entry.stat()
+                        identity = [entry.inode(), st.st_size, st.st_mtime_ns]
+                    except OSError:
+                        continue
+                    if known.get(entry.name) == identity:
+                        files[entry.name] = identity
+                        continue
+                    offered += 1
+                    if process(entry.path, st):
+                        settled = False
+                    else:
+                        files[entry.name] = identity
+        except OSError as e:
+            logging.warning(f"Could not scan {folder}: {e}")
+            continue
+        listed += 1
+        new[rel] = {"mtime_ns": mtime_ns if settled else None, "subdirs": subdirs, "files": files}
+
+    if index is not None:
+        index.fingerprint = fingerprint
+        index.dirs = new
+    return offered, listed, skipped
+
+def count_dirs(root, limit):
+    """Count the folders a recursive watch on root would cover, stopping past limit."""
+    count = 0
+    stack = [root]
+    while stack and count <= limit:
+        folder = stack.pop()
+        count += 1
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return count
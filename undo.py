@@ -0,0 +1,258 @@
+"""
+Undo for Silent Organizer
+Put organized files back where they came from, driven by the move history
+
+Usage: python undo.py --since "2026-10-16 09:00" --folder "C:/Users/you/Downloads" [--dry-run]
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import threading
+from datetime import datetime
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from history_store import HistoryStore, HISTORY_FILE, LEGACY_HISTORY_FILE
+from history_index import HistoryIndex, record_kind
+from move_engine import move_file
+from supervisor import read_pid_file
+
+UNDO_BATCH = 500  # moves per batch; history is synced and progress reported after each
+DEFAULT_UNDO_WORKERS = 4
+MTIME_SLACK = 2  # seconds between a file's mtime and the history timestamp of the same move
+
+# current: where the file is now; original: where it goes back to;
+# copy: the record was a skipped duplicate, so the file is copied back from its twin
+UndoStep = namedtuple('UndoStep', ['record', 'current', 'original', 'copy', 'identity'])
+
+def _path_key(path):
+    return os.path.normcase(os.path.normpath(path))
+
+def _move_key(folder, destination, file, date):
+    return (_path_key(os.path.join(folder, destination)), file, date)
+
+def _timestamp(date):
+    try:
+        return datetime.strptime(date, '%Y-%m-%d %H:%M:%S').timestamp()
+    except (TypeError, ValueError):
+        return None
+
+class UndoPlan:
+    """The reverse moves for a history selection, and what stands in their way."""
+
+    def __init__(self):
+        self.steps = []
+        self.conflicts = []  # (record, reason)
+        self.already_undone = 0
+
+    def summary(self):
+        lines = [f"{len(self.steps)} file(s) can be put back."]
+        if self.already_undone:
+            lines.append(f"{self.already_undone} move(s) were already undone.")
+        for reason, count in Counter(reason for _, reason in self.conflicts).most_common():
+            lines.append(f"{count} file(s) skipped: {reason}.")
+        return '\n'.join(lines)
+
+def plan_undo(index, **filters):
+    """Plan the undo of every move matching `filters` (see HistoryIndex.query).
+
+    History is read newest first a page at a time, so a selection of tens
+    of thousands of moves never holds the whole log in memory. A move is
+    left out, with a reason, if the file is gone or was changed after it
+    was organized, if its original name is taken, or if a newer move in
+    the same selection goes back to the same name. Moves undone before
+    are skipped.
+    """
+    index.refresh()
+    undone = set()
+    for record in index.iter_records(kind='undo', source_folder=filters.get('source_folder')):
+        undone.add(_move_key(record.get('source_folder', ''), record.get('undo', ''),
+                             record.get('file'), record.get('moved')))
+
+    plan = UndoPlan()
+    claimed = set()
+    for record in index.iter_records(**filters):
+        if record_kind(record) == 'undo':
+            continue
+        folder, destination, filename = record.get('source_folder'), record.get('destination'), record.get('file')
+        if not folder or not destination or not filename:
+            plan.conflicts.append((record, "the history record is incomplete"))
+            continue
+        if _move_key(folder, destination, filename, record.get('date')) in undone:
+            plan.already_undone += 1
+            continue
+        current = os.path.join(folder, destination)
+        original = os.path.join(folder, record.get('from') or filename)
+        try:
+            st = os.stat(current)
+        except OSError:
+            plan.conflicts.append((record, "it is no longer in the category folder"))
+            continue
+        moved_at = _timestamp(record.get('date'))
+        if moved_at is not None and st.st_mtime > moved_at + MTIME_SLACK:
+            plan.conflicts.append((record, "it was changed after it was organized"))
+            continue
+        if not os.path.isdir(folder):
+            plan.conflicts.append((record, "its monitored folder is gone"))
+            continue
+        if _path_key(original) in claimed:
+            plan.conflicts.append((record, "a newer move goes back to the same name"))
+            continue
+        if os.path.lexists(original):
+            plan.conflicts.append((record, "its original name is taken"))
+            continue
+        claimed.add(_path_key(original))
+        plan.steps.append(UndoStep(record, current, original, record_kind(record) == 'skip',
+                                   (st.st_ino, st.st_size, st.st_mtime_ns)))
+    return plan
+
+def _undo_step(step):
+    """Put one file back; returns (error or None, stat of the restored file)."""
+    try:
+        st = os.stat(step.current)
+        if (st.st_ino, st.st_size, st.st_mtime_ns) != step.identity:
+            return "it changed after the undo was planned", None
+        os.makedirs(os.path.dirname(step.original), exist_ok=True)
+        # Claim the name the way the organizer does, so nothing that appeared
+        # there since planning is overwritten
+        fd = os.open(step.original, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return "its original name is taken", None
+    except OSError as e:
+        return str(e), None
+    os.close(fd)
+    try:
+        if step.copy:
+            shutil.copy2(step.current, step.original)
+        else:
+            move_file(step.current, step.original)
+        return None, os.stat(step.original)
+    except OSError as e:
+        try:
+            if os.path.getsize(step.original) == 0:
+                os.unlink(step.original)
+        except OSError:
+            pass
+        return str(e), None
+
+def compensating_record(step, st):
+    """History record for an undone move; `undo` and `moved` name the move it reverses."""
+    record = step.record
+    return {
+        "file": record["file"], "type": record.get("type"), "date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "destination": os.path.relpath(step.original, record["source_folder"]),
+        "source_folder": record["source_folder"],
+        "undo": record["destination"], "moved": record.get("date"),
+        "inode": st.st_ino, "mtime_ns": st.st_mtime_ns
+    }
+
+def run_undo(plan, history, workers=DEFAULT_UNDO_WORKERS, batch_size=UNDO_BATCH, progress=None):
+    """Carry out a plan in parallel batches, recording each reversal in `history`.
+
+    Run it while the organizer is stopped: the organizer leaves restored
+    files alone from its next start (see RestoredFiles), not mid-run.
+    progress(done, total) is called after each batch. Returns (number
+    restored, [(record, error)]).
+    """
+    restored, failed = 0, []
+    done, total = 0, len(plan.steps)
+    # Copies go in batches of their own, first: a skipped duplicate is copied
+    # from its twin, which an older move in the same plan may take away
+    groups = ([step for step in plan.steps if step.copy], [step for step in plan.steps if not step.copy])
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Undo") as pool:
+        for steps in groups:
+            for start in range(0, len(steps), batch_size):
+                batch = steps[start:start + batch_size]
+                for step, (error, st) in zip(batch, pool.map(_undo_step, batch)):
+                    if error:
+                        failed.append((step.record, error))
+                        continue
+                    history.append(compensating_record(step, st))
+                    restored += 1
+                history.sync()
+                done += len(batch)
+                if progress:
+                    progress(done, total)
+    return restored, failed
+
+class RestoredFiles:
+    """Files put back by an undo, which the organizer must leave where they are.
+
+    Loaded from the undo records in the history. A file stays exempt while
+    it keeps the inode and mtime it had when it was restored, so editing or
+    replacing it makes it fair game again.
+    """
+
+    def __init__(self):
+        self._files = {}  # normcased path -> (inode, mtime_ns)
+        self._lock = threading.Lock()
+
+    def load(self, index):
+        index.refresh()
+        files = {}
+        for record in index.iter_records(kind='undo'):
+            if 'inode' in record and record.get('source_folder') and record.get('destination'):
+                path = _path_key(os.path.join(record['source_folder'], record['destination']))
+                files.setdefault(path, (record['inode'], record.get('mtime_ns')))  # newest undo wins
+        with self._lock:
+            self._files = files
+        return len(files)
+
+    def contains(self, path, st):
+        if not self._files:
+            return False
+        with self._lock:
+            identity = self._files.get(_path_key(path))
+        if identity is None:
+            return False
+        if st.st_ino == 0:
+            # DirEntry.stat() on Windows reports no inode; the scan hands us one of those
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+        return identity == (st.st_ino, st.st_mtime_ns)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Put organized files back where they came from.")
+    parser.add_argument("--since", help="first move to undo, 'YYYY-MM-DD[ HH:MM:SS]'")
+    parser.add_argument("--until", help="undo moves before this time, 'YYYY-MM-DD[ HH:MM:SS]'")
+    parser.add_argument("--category", help="only files sorted into this category, e.g. Documents")
+    parser.add_argument("--folder", help="only files from this monitored folder, as shown in the History tab")
+    parser.add_argument("--workers", type=int, default=DEFAULT_UNDO_WORKERS)
+    parser.add_argument("--dry-run", action="store_true", help="show the plan without moving anything")
+    parser.add_argument("--yes", action="store_true", help="do not ask for confirmation")
+    args = parser.parse_args(argv)
+
+    owner = read_pid_file()
+    if owner is not None:
+        print(f"The organizer is running (PID {owner['pid']}); stop it first, "
+              f"or it would organize the restored files again.")
+        return 1
+
+    plan = plan_undo(HistoryIndex(legacy_path=LEGACY_HISTORY_FILE), since=args.since, until=args.until,
+                     type=args.category, source_folder=args.folder)
+    print(plan.summary())
+    for record, reason in plan.conflicts[:20]:
+        print(f"  {os.path.join(record.get('source_folder', ''), record.get('destination', ''))}: {reason}")
+    if len(plan.conflicts) > 20:
+        print(f"  ... and {len(plan.conflicts) - 20} more")
+    if args.dry_run or not plan.steps:
+        return 0
+    if not args.yes and input(f"Put {len(plan.steps)} file(s) back? [y/N] ").strip().lower() not in ('y', 'yes'):
+        return 1
+
+    history = HistoryStore(HISTORY_FILE, legacy_path=LEGACY_HISTORY_FILE)
+    try:
+        restored, failed = run_undo(plan, history, args.workers,
+                                    progress=lambda done, total: print(f"{done}/{total}"))
+    finally:
+        history.close()
+    print(f"Put back {restored} file(s).")
+    for record, error in failed:
+        print(f"  Could not restore {record['file']}: {error}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())